@@ -1,19 +1,20 @@
 import streamlit as st
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import os
 import json
 import io
 import base64
 import traceback
+import uuid
+import math
 import requests
+import pandas as pd
 from caja_chica import mostrar_caja_chica
-
-# PDF
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import cm
-from reportlab.lib.utils import ImageReader
-from PIL import Image, ImageOps
+from parte_pdf import generate_parte_diario_pdf_bytes
+from envios import reclamar_envio, liberar_envio, registrar_resultado, esperar_resultado
+from obras_registro import cargar_registro, obra_de_usuario, buscar_obras
+from serie_gastos import (construir_indice, indice_vigente, agregar_gasto, gasto_en_rango, gasto_total,
+                          proyeccion_consumo, serie_diaria)
 
 st.set_page_config(page_title="Arq. Supervisor 2025", layout="wide")
 
@@ -24,14 +25,7 @@ DEFAULT_DRIVE_FOLDER_ID = "1L_0QzSQRk6-uGgTs2lin1LGb4YwsoDJ-"
 for folder in ["obras", "obras/fotos"]:
     os.makedirs(folder, exist_ok=True)
 
-OBRAS = {
-    "rinconada": "La Rinconada – La Molina",
-    "pachacutec": "Ciudad Pachacútec – Ventanilla"
-}
-
-PRESUPUESTO_BASE = {
-    "pachacutec": 99524.0
-}
+OBRAS_POR_PAGINA = 20
 
 CATEGORIAS_GASTO = ["Materiales", "Mano de obra", "Equipos", "Transporte", "Otros"]
 
@@ -58,6 +52,17 @@ def init_state(key: str, default):
         st.session_state[key] = default
 
 
+# Registro de obras (obras_registro.py): se lee una vez por proceso y se comparte
+# entre sesiones; tras registrar_obra() llamar a registro_obras.clear().
+@st.cache_resource(show_spinner=False)
+def registro_obras() -> dict:
+    return cargar_registro()
+
+
+def nombre_obra(obra: str) -> str:
+    return registro_obras()["obras"][obra]["nombre"]
+
+
 # =========================
 # Apps Script Upload
 # =========================
@@ -104,184 +109,6 @@ def upload_pdf_via_apps_script(pdf_bytes: io.BytesIO, filename: str) -> dict:
     return data
 
 
-# =========================
-# PDF (Bytes)
-# =========================
-def _draw_wrapped_text(c, text, x, y, max_width, line_height=14, font="Helvetica", size=10):
-    c.setFont(font, size)
-    words = (text or "").split()
-    if not words:
-        return y
-
-    line = ""
-    for w in words:
-        test = (line + " " + w).strip()
-        if c.stringWidth(test, font, size) <= max_width:
-            line = test
-        else:
-            c.drawString(x, y, line)
-            y -= line_height
-            line = w
-
-    if line:
-        c.drawString(x, y, line)
-        y -= line_height
-
-    return y
-
-
-def generate_parte_diario_pdf_bytes(
-    obra_key: str,
-    obra_name: str,
-    fecha_str: str,
-    responsable: str,
-    avance_pct: int,
-    obs: str,
-    gastos_rows: list,
-    total_gastos_hoy: float,
-    rutas_fotos: list
-) -> io.BytesIO:
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    margin = 2 * cm
-    y = height - margin
-
-    # Header
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(margin, y, "PARTE DIARIO DE OBRA")
-    y -= 18
-
-    c.setFont("Helvetica", 11)
-    c.drawString(margin, y, f"Obra: {obra_name}")
-    y -= 14
-    c.drawString(margin, y, f"Fecha: {fecha_str}")
-    y -= 14
-    c.drawString(margin, y, f"Responsable: {responsable}")
-    y -= 14
-    c.drawString(margin, y, f"Avance logrado hoy: {avance_pct}%")
-    y -= 18
-
-    # Observaciones
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(margin, y, "Observaciones")
-    y -= 14
-    c.setFont("Helvetica", 10)
-    y = _draw_wrapped_text(c, obs or "-", margin, y, max_width=width - 2 * margin, line_height=13, size=10)
-    y -= 6
-
-    # Gastos
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(margin, y, "Gastos del día")
-    y -= 14
-
-    col_tipo = margin
-    col_det = margin + 4.2 * cm
-
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(col_tipo, y, "Tipo")
-    c.drawString(col_det, y, "Detalle")
-    c.drawRightString(width - margin, y, "Monto (S/)")
-    y -= 10
-    c.line(margin, y, width - margin, y)
-    y -= 12
-
-    c.setFont("Helvetica", 9)
-
-    if not gastos_rows:
-        c.drawString(margin, y, "Sin gastos registrados.")
-        y -= 14
-    else:
-        for row in gastos_rows:
-            tipo = str(row.get("tipo", "")).strip()
-            detalle = str(row.get("detalle", "")).strip() or "-"
-            monto = float(row.get("monto", 0.0) or 0.0)
-
-            if y < 6 * cm:
-                c.showPage()
-                y = height - margin
-                c.setFont("Helvetica-Bold", 12)
-                c.drawString(margin, y, "Gastos del día (continuación)")
-                y -= 16
-                c.setFont("Helvetica", 9)
-
-            c.drawString(col_tipo, y, (tipo[:28] + "…") if len(tipo) > 28 else tipo)
-
-            max_det_w = (width - margin) - col_det - 4.0 * cm
-            y_det = _draw_wrapped_text(c, detalle, col_det, y, max_width=max_det_w, line_height=11, font="Helvetica", size=9)
-
-            c.drawRightString(width - margin, y, f"{monto:,.2f}")
-            y = min(y_det, y - 11)
-
-    y -= 8
-    c.setFont("Helvetica-Bold", 10)
-    c.drawRightString(width - margin, y, f"TOTAL HOY: S/ {float(total_gastos_hoy):,.2f}")
-    y -= 18
-
-    # Fotos
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(margin, y, "Evidencia fotográfica")
-    y -= 14
-
-    if not rutas_fotos:
-        c.setFont("Helvetica", 10)
-        c.drawString(margin, y, "Sin fotos adjuntas.")
-        y -= 14
-    else:
-        max_img_w = width - 2 * margin
-        max_img_h = 7.5 * cm
-
-        for i, path in enumerate(rutas_fotos, start=1):
-            if not os.path.exists(path):
-                continue
-
-            if y < (max_img_h + 3 * cm):
-                c.showPage()
-                y = height - margin
-                c.setFont("Helvetica-Bold", 12)
-                c.drawString(margin, y, "Evidencia fotográfica (continuación)")
-                y -= 18
-
-            try:
-                img = Image.open(path)
-                img = ImageOps.exif_transpose(img)
-                img = img.convert("RGB")
-
-                iw, ih = img.size
-                scale = min(max_img_w / iw, max_img_h / ih)
-                draw_w = iw * scale
-                draw_h = ih * scale
-
-                img_reader = ImageReader(img)
-
-                c.setFont("Helvetica", 9)
-                c.drawString(margin, y, f"Foto {i}: {os.path.basename(path)}")
-                y -= 12
-
-                c.drawImage(
-                    img_reader,
-                    margin,
-                    y - draw_h,
-                    width=draw_w,
-                    height=draw_h,
-                    preserveAspectRatio=True,
-                    mask="auto"
-                )
-                y -= (draw_h + 14)
-
-            except Exception as e:
-                c.setFont("Helvetica", 10)
-                c.drawString(margin, y, f"No se pudo insertar la imagen: {os.path.basename(path)} | {e}")
-                y -= 14
-
-    c.setFont("Helvetica-Oblique", 8)
-    c.drawString(margin, 1.2 * cm, f"Generado automáticamente | Obra: {obra_key}")
-    c.save()
-
-    buffer.seek(0)
-    return buffer
-
-
 # =========================
 # Auth
 # =========================
@@ -318,15 +145,46 @@ if not check_password():
 # =========================
 # Obra
 # =========================
-if st.session_state["auth"] == "jefe":
-    obra_actual = st.sidebar.selectbox(
+def selector_obras(registro: dict) -> str:
+    # Búsqueda + paginación: el selectbox nunca lista más de OBRAS_POR_PAGINA obras
+    init_state("obra_seleccionada", next(iter(registro["obras"])))
+    if st.session_state["obra_seleccionada"] not in registro["obras"]:
+        st.session_state["obra_seleccionada"] = next(iter(registro["obras"]))
+
+    texto = st.sidebar.text_input("Buscar obra", key="obra_buscar")
+    claves = buscar_obras(registro, texto)
+    paginas = max(1, math.ceil(len(claves) / OBRAS_POR_PAGINA))
+    pagina = 1
+    if paginas > 1:
+        pagina = int(st.sidebar.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1))
+    visibles = claves[(pagina - 1) * OBRAS_POR_PAGINA:pagina * OBRAS_POR_PAGINA]
+
+    actual = st.session_state["obra_seleccionada"]
+    elegida = st.sidebar.selectbox(
         "Seleccionar obra",
-        options=list(OBRAS.keys()),
-        format_func=lambda x: OBRAS[x]
+        options=visibles,
+        index=visibles.index(actual) if actual in visibles else None,
+        format_func=lambda x: registro["obras"][x]["nombre"],
+        placeholder=f"{len(claves)} obra(s) encontrada(s)"
     )
+    if elegida:
+        st.session_state["obra_seleccionada"] = elegida
+    return st.session_state["obra_seleccionada"]
+
+
+registro = registro_obras()
+if not registro["obras"]:
+    st.error("No hay obras registradas.")
+    st.stop()
+
+if st.session_state["auth"] == "jefe":
+    obra_actual = selector_obras(registro)
 else:
-    obra_actual = st.session_state["auth"].split("-")[1]
-    st.sidebar.success(f"Obra asignada: {OBRAS[obra_actual]}")
+    obra_actual = obra_de_usuario(registro, st.session_state["auth"])
+    if obra_actual is None:
+        st.error("Tu usuario no tiene una obra asignada.")
+        st.stop()
+    st.sidebar.success(f"Obra asignada: {nombre_obra(obra_actual)}")
 
 if st.sidebar.button("Caja Chica"):
     st.session_state["pagina"] = "caja"
@@ -342,14 +200,17 @@ def guardar(obra, datos):
 
 def cargar(obra):
     archivo = f"obras/{obra}.json"
-    presupuesto_def = float(PRESUPUESTO_BASE.get(obra, 0.0))
+    obra_reg = registro_obras()["obras"][obra]
+    presupuesto_reg = obra_reg["presupuesto"]
+    presupuesto_def = float(presupuesto_reg or 0.0)
 
     plantilla = {
-        "info": OBRAS[obra],
+        "info": obra_reg["nombre"],
         "avance": [],
         "presupuesto_total": presupuesto_def,
         "gastos": [],
-        "gasto_acumulado": 0.0
+        "gasto_acumulado": 0.0,
+        "indice_gastos": construir_indice([])
     }
 
     if not os.path.exists(archivo):
@@ -365,10 +226,16 @@ def cargar(obra):
     if not isinstance(datos, dict):
         datos = plantilla
 
-    datos.setdefault("info", OBRAS[obra])
+    # Solo se reescribe el archivo si la normalización cambió algo
+    antes = None if datos is plantilla else (set(datos), datos.get("presupuesto_total"), datos.get("gasto_acumulado"))
+
+    datos.setdefault("info", obra_reg["nombre"])
     datos.setdefault("avance", [])
     datos.setdefault("gastos", [])
-    datos["presupuesto_total"] = float(PRESUPUESTO_BASE.get(obra, datos.get("presupuesto_total", 0.0) or 0.0))
+    if presupuesto_reg is not None:
+        datos["presupuesto_total"] = float(presupuesto_reg)
+    else:
+        datos["presupuesto_total"] = float(datos.get("presupuesto_total", 0.0) or 0.0)
 
     # recalcular acumulado
     gasto_acum = 0.0
@@ -379,7 +246,12 @@ def cargar(obra):
             pass
     datos["gasto_acumulado"] = float(gasto_acum)
 
-    guardar(obra, datos)
+    indice_ok = indice_vigente(datos.get("indice_gastos"), datos["gastos"], datos["gasto_acumulado"])
+    if not indice_ok:
+        datos["indice_gastos"] = construir_indice(datos["gastos"])
+
+    if not indice_ok or antes != (set(datos), datos["presupuesto_total"], datos["gasto_acumulado"]):
+        guardar(obra, datos)
     return datos
 
 
@@ -399,20 +271,6 @@ datos = cargar(obra_actual)
 # =========================
 # Semáforo
 # =========================
-def calcular_totales_gastos(gastos, hoy_str):
-    gasto_acumulado = 0.0
-    gasto_diario = 0.0
-    for g in gastos:
-        try:
-            m = float(g.get("monto", 0))
-        except Exception:
-            m = 0.0
-        gasto_acumulado += m
-        if str(g.get("fecha", "")) == hoy_str:
-            gasto_diario += m
-    return float(gasto_diario), float(gasto_acumulado)
-
-
 def semaforo_porcentaje(pct):
     if pct is None:
         return ("#95a5a6", "SIN DATOS")
@@ -426,7 +284,7 @@ def semaforo_porcentaje(pct):
 # =========================
 # UI
 # =========================
-st.title(f"Obra: {OBRAS[obra_actual]}")
+st.title(f"Obra: {nombre_obra(obra_actual)}")
 if st.session_state["auth"] == "jefe":
     st.sidebar.success("MODO JEFE – Acceso total")
 else:
@@ -435,32 +293,75 @@ else:
 hoy = date.today()
 hoy_str = str(hoy)
 
-presupuesto_total = float(datos.get("presupuesto_total", 0.0))
-gastos = datos.get("gastos", [])
-gasto_diario, gasto_acumulado = calcular_totales_gastos(gastos, hoy_str)
-
-pct = (gasto_acumulado / presupuesto_total) * 100.0 if presupuesto_total > 0 else None
-color, estado = semaforo_porcentaje(pct)
-
-st.subheader("Semáforo de presupuesto (control de rentabilidad)")
-c1, c2, c3, c4 = st.columns(4)
-c1.metric("Presupuesto total", f"S/ {presupuesto_total:,.2f}" if presupuesto_total > 0 else "—")
-c2.metric("Gasto diario (hoy)", f"S/ {gasto_diario:,.2f}")
-c3.metric("Gasto acumulado", f"S/ {gasto_acumulado:,.2f}")
-c4.metric("% consumido", f"{pct:.1f}%" if pct is not None else "—")
-
-st.markdown(
-    f"""
-    <div style="display:flex;align-items:center;gap:12px;padding:14px;border:1px solid rgba(255,255,255,0.15);border-radius:12px;">
-      <div style="width:18px;height:18px;border-radius:50%;background:{color};box-shadow:0 0 10px {color};"></div>
-      <div style="font-size:16px;"><b>{estado}</b></div>
-      <div style="opacity:0.8;font-size:14px;">
-        &nbsp;| Verde ≤95% &nbsp;| Ámbar 96–100% &nbsp;| Rojo &gt;100%
-      </div>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
+
+# Cada sección es un fragmento: interactuar con un widget solo re-ejecuta su
+# sección, no check_password()/cargar() ni el resto de la página.
+@st.fragment
+def seccion_semaforo():
+    presupuesto_total = float(datos.get("presupuesto_total", 0.0))
+    indice_gastos = datos["indice_gastos"]
+    # Totales desde el índice: dos búsquedas binarias en lugar de recorrer los gastos
+    gasto_diario = gasto_en_rango(indice_gastos, hoy, hoy)
+    gasto_acumulado = gasto_total(indice_gastos)
+
+    pct = (gasto_acumulado / presupuesto_total) * 100.0 if presupuesto_total > 0 else None
+    color, estado = semaforo_porcentaje(pct)
+
+    st.subheader("Semáforo de presupuesto (control de rentabilidad)")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Presupuesto total", f"S/ {presupuesto_total:,.2f}" if presupuesto_total > 0 else "—")
+    c2.metric("Gasto diario (hoy)", f"S/ {gasto_diario:,.2f}")
+    c3.metric("Gasto acumulado", f"S/ {gasto_acumulado:,.2f}")
+    c4.metric("% consumido", f"{pct:.1f}%" if pct is not None else "—")
+
+    col_sem, col_proy = st.columns(2)
+
+    with col_sem:
+        st.markdown(
+            f"""
+            <div style="display:flex;align-items:center;gap:12px;padding:14px;border:1px solid rgba(255,255,255,0.15);border-radius:12px;">
+              <div style="width:18px;height:18px;border-radius:50%;background:{color};box-shadow:0 0 10px {color};"></div>
+              <div style="font-size:16px;"><b>{estado}</b></div>
+              <div style="opacity:0.8;font-size:14px;">
+                &nbsp;| Verde ≤95% &nbsp;| Ámbar 96–100% &nbsp;| Rojo &gt;100%
+              </div>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+        rango = st.date_input("Gasto en rango", value=(hoy - timedelta(days=6), hoy), key=f"rango_{obra_actual}")
+        if isinstance(rango, (list, tuple)) and len(rango) == 2:
+            st.metric(f"{rango[0].strftime('%d/%m/%Y')} – {rango[1].strftime('%d/%m/%Y')}",
+                      f"S/ {gasto_en_rango(indice_gastos, rango[0], rango[1]):,.2f}")
+
+    with col_proy:
+        proy = proyeccion_consumo(indice_gastos, presupuesto_total, hoy)
+        serie = serie_diaria(indice_gastos)
+        if not serie:
+            st.info("Sin gastos registrados para proyectar.")
+        else:
+            graf = pd.DataFrame(serie, columns=["fecha", "Acumulado"]).set_index("fecha")
+            if proy and proy["fecha_100"] and proy["fecha_100"] > hoy:
+                graf.loc[hoy, "Proyección"] = proy["acumulado"]
+                graf.loc[proy["fecha_100"], "Proyección"] = presupuesto_total
+            if presupuesto_total > 0:
+                graf["Presupuesto"] = presupuesto_total
+            graf.index = pd.to_datetime(graf.index)
+            st.line_chart(graf.sort_index())
+
+            if proy is None:
+                st.caption("Sin presupuesto definido: no hay proyección.")
+            elif proy["fecha_100"] is None:
+                st.caption("Sin gastos en los últimos 14 días: no hay proyección.")
+            elif proy["fecha_100"] <= hoy:
+                st.caption(f"Presupuesto alcanzado el {proy['fecha_100'].strftime('%d/%m/%Y')}.")
+            else:
+                st.caption(f"Ritmo últimos 14 días: S/ {proy['ritmo_diario']:,.2f}/día · "
+                           f"100% estimado el {proy['fecha_100'].strftime('%d/%m/%Y')}")
+
+
+seccion_semaforo()
 
 st.divider()
 
@@ -522,149 +423,193 @@ if st.session_state.get(reset_flag_key, False):
     st.session_state[uploader_ver_key] += 1
     st.session_state[reset_flag_key] = False
 
-responsable = st.text_input("Tu nombre", key=k_nombre)
 
-st.subheader("Gastos del día")
-st.caption(f"Fecha actual: {hoy.strftime('%d/%m/%Y')}")
+@st.fragment
+def formulario_parte_diario():
+    responsable = st.text_input("Tu nombre", key=k_nombre)
 
-for cat in CATEGORIAS_GASTO:
-    init_state(det_key(cat), "")
-    init_state(mon_key(cat), 0.0)
+    st.subheader("Gastos del día")
+    st.caption(f"Fecha actual: {hoy.strftime('%d/%m/%Y')}")
 
-    a, b, c = st.columns([2, 6, 2])
-    a.write(cat)
-    b.text_input("Detalle", key=det_key(cat), label_visibility="collapsed")
-    c.number_input("Monto (S/)", key=mon_key(cat), label_visibility="collapsed",
-                   min_value=0.0, step=10.0, format="%.2f")
-
-total_hoy = sum(float(st.session_state.get(mon_key(cat), 0.0) or 0.0) for cat in CATEGORIAS_GASTO)
-st.metric("Monto total diario", f"S/ {total_hoy:,.2f}")
+    for cat in CATEGORIAS_GASTO:
+        init_state(det_key(cat), "")
+        init_state(mon_key(cat), 0.0)
+
+        a, b, c = st.columns([2, 6, 2])
+        a.write(cat)
+        b.text_input("Detalle", key=det_key(cat), label_visibility="collapsed")
+        c.number_input("Monto (S/)", key=mon_key(cat), label_visibility="collapsed",
+                       min_value=0.0, step=10.0, format="%.2f")
+
+    total_hoy = sum(float(st.session_state.get(mon_key(cat), 0.0) or 0.0) for cat in CATEGORIAS_GASTO)
+    st.metric("Monto total diario", f"S/ {total_hoy:,.2f}")
+
+    avance = st.slider("Avance logrado hoy (%)", 0, 30, 5, key=k_avance)
+    obs = st.text_area("Observaciones", key=k_obs)
+
+    fotos_key = f"fotos_{base_key}_v{st.session_state[uploader_ver_key]}"
+    # Un token por instancia del formulario: cambia junto con el uploader al resetear
+    token_key = f"pd_token_{base_key}_v{st.session_state[uploader_ver_key]}"
+    init_state(token_key, f"{base_key}_v{st.session_state[uploader_ver_key]}_{uuid.uuid4().hex}")
+    fotos = st.file_uploader(
+        "Fotos del avance (mínimo 3)",
+        accept_multiple_files=True,
+        type=["jpg", "png", "jpeg"],
+        key=fotos_key
+    )
 
-avance = st.slider("Avance logrado hoy (%)", 0, 30, 5, key=k_avance)
-obs = st.text_area("Observaciones", key=k_obs)
+    # La key del botón cambia con el formulario: un segundo toque que llega después
+    # del reset apunta al botón anterior y Streamlit lo descarta, en lugar de
+    # reclamar el token nuevo como si fuera otro envío.
+    enviar = st.button("ENVIAR PARTE DIARIO", type="primary",
+                       key=f"enviar_{base_key}_v{st.session_state[uploader_ver_key]}")
+
+    if enviar:
+        if "pasante" in st.session_state["auth"] and (not fotos or len(fotos) < 3):
+            st.error("¡Sube mínimo 3 fotos!")
+            st.stop()
+
+        # Doble toque o reenvío: no repetir guardado/PDF/subida, mostrar el resultado del primero
+        token = st.session_state[token_key]
+        if not reclamar_envio(token):
+            resultado = esperar_resultado(token)
+            if resultado is None:
+                # El primer envío sigue en curso o falló: no resetear, para poder reintentar
+                st.warning("Este parte diario ya se está procesando. Espera unos segundos y vuelve a enviarlo.")
+                st.stop()
+            st.session_state[flash_key] = resultado
+            st.session_state[reset_flag_key] = True
+            st.rerun()
+
+        # Si algo falla antes de registrar el resultado se libera el token, así el
+        # reintento del mismo formulario vuelve a procesarse en lugar de bloquearse.
+        registrado = False
+        try:
+            # Guardar fotos (para histórico y PDF)
+            rutas_fotos = []
+            if fotos:
+                for f in fotos:
+                    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+                    ruta = f"obras/fotos/{obra_actual}_{hoy_str}_{timestamp}_{f.name}"
+                    with open(ruta, "wb") as file:
+                        file.write(f.getbuffer())
+                    rutas_fotos.append(ruta)
+
+            # Releer: el formulario pudo quedar abierto mientras otra sesión guardaba
+            datos_obra = cargar(obra_actual)
+
+            # Guardar avance
+            datos_obra["avance"].append({
+                "fecha": hoy_str,
+                "responsable": responsable,
+                "avance": int(avance),
+                "obs": obs,
+                "fotos": rutas_fotos
+            })
+
+            # Guardar gastos + tabla para PDF
+            gastos_hoy_rows = []
+            for cat in CATEGORIAS_GASTO:
+                detalle = str(st.session_state.get(det_key(cat), "")).strip()
+                monto = float(st.session_state.get(mon_key(cat), 0.0) or 0.0)
+                if monto > 0:
+                    row = {
+                        "fecha": hoy_str,
+                        "responsable": st.session_state.get("user", "").strip(),
+                        "tipo": cat,
+                        "detalle": detalle,
+                        "monto": monto
+                    }
+                    datos_obra["gastos"].append(row)
+                    agregar_gasto(datos_obra["indice_gastos"], hoy_str, monto)
+                    gastos_hoy_rows.append({"tipo": cat, "detalle": detalle, "monto": monto})
+
+            recalcular_gasto_acumulado(datos_obra)
+            guardar(obra_actual, datos_obra)
+
+            # Generar PDF + subir por Apps Script
+            try:
+                obra_name = nombre_obra(obra_actual)
+                obra_tag = safe_filename(obra_name)
+                filename = f"Informe_{obra_tag}_{hoy_str}_ParteDiario.pdf"
+
+                pdf_bytes = generate_parte_diario_pdf_bytes(
+                    obra_key=obra_actual,
+                    obra_name=obra_name,
+                    fecha_str=hoy_str,
+                    responsable=responsable,
+                    avance_pct=int(avance),
+                    obs=obs,
+                    gastos_rows=gastos_hoy_rows,
+                    total_gastos_hoy=float(total_hoy),
+                    rutas_fotos=rutas_fotos
+                )
 
-fotos_key = f"fotos_{base_key}_v{st.session_state[uploader_ver_key]}"
-fotos = st.file_uploader(
-    "Fotos del avance (mínimo 3)",
-    accept_multiple_files=True,
-    type=["jpg", "png", "jpeg"],
-    key=fotos_key
-)
+                uploaded = upload_pdf_via_apps_script(pdf_bytes, filename)
+
+                # Soportar varias respuestas posibles del Apps Script
+                link = uploaded.get("url") or uploaded.get("webViewLink") or uploaded.get("link")
+
+                st.session_state[flash_key] = {
+                    "ok": True,
+                    "msg": "¡Parte diario registrado y PDF subido a Google Drive correctamente!",
+                    "link": link,
+                    "err": None
+                }
+
+            except Exception:
+                st.session_state[flash_key] = {
+                    "ok": False,
+                    "msg": "Parte diario registrado, pero falló la subida a Drive.",
+                    "link": None,
+                    "err": traceback.format_exc()
+                }
+
+            registrar_resultado(token, st.session_state[flash_key])
+            registrado = True
+        finally:
+            if not registrado:
+                liberar_envio(token)
+
+        st.session_state[reset_flag_key] = True
+        st.rerun()
 
-enviar = st.button("ENVIAR PARTE DIARIO", type="primary")
 
-if enviar:
-    if "pasante" in st.session_state["auth"] and (not fotos or len(fotos) < 3):
-        st.error("¡Sube mínimo 3 fotos!")
-        st.stop()
+formulario_parte_diario()
 
-    # Guardar fotos (para histórico y PDF)
-    rutas_fotos = []
-    if fotos:
-        for f in fotos:
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            ruta = f"obras/fotos/{obra_actual}_{hoy_str}_{timestamp}_{f.name}"
-            with open(ruta, "wb") as file:
-                file.write(f.getbuffer())
-            rutas_fotos.append(ruta)
-
-    # Guardar avance
-    datos["avance"].append({
-        "fecha": hoy_str,
-        "responsable": responsable,
-        "avance": int(avance),
-        "obs": obs,
-        "fotos": rutas_fotos
-    })
-
-    # Guardar gastos + tabla para PDF
-    gastos_hoy_rows = []
-    for cat in CATEGORIAS_GASTO:
-        detalle = str(st.session_state.get(det_key(cat), "")).strip()
-        monto = float(st.session_state.get(mon_key(cat), 0.0) or 0.0)
-        if monto > 0:
-            row = {
-                "fecha": hoy_str,
-                "responsable": st.session_state.get("user", "").strip(),
-                "tipo": cat,
-                "detalle": detalle,
-                "monto": monto
-            }
-            datos["gastos"].append(row)
-            gastos_hoy_rows.append({"tipo": cat, "detalle": detalle, "monto": monto})
-
-    recalcular_gasto_acumulado(datos)
-    guardar(obra_actual, datos)
-
-    # Generar PDF + subir por Apps Script
-    try:
-        obra_name = OBRAS[obra_actual]
-        obra_tag = safe_filename(obra_name)
-        filename = f"Informe_{obra_tag}_{hoy_str}_ParteDiario.pdf"
-
-        pdf_bytes = generate_parte_diario_pdf_bytes(
-            obra_key=obra_actual,
-            obra_name=obra_name,
-            fecha_str=hoy_str,
-            responsable=responsable,
-            avance_pct=int(avance),
-            obs=obs,
-            gastos_rows=gastos_hoy_rows,
-            total_gastos_hoy=float(total_hoy),
-            rutas_fotos=rutas_fotos
-        )
-
-        uploaded = upload_pdf_via_apps_script(pdf_bytes, filename)
+# =========================
+# Historial
+# =========================
+@st.fragment
+def seccion_historial():
+    st.header("Historial de Avances")
 
-        # Soportar varias respuestas posibles del Apps Script
-        link = uploaded.get("url") or uploaded.get("webViewLink") or uploaded.get("link")
+    avances = datos.get("avance", [])
+    if not avances:
+        st.info("No hay partes diarios registrados para esta obra aún.")
+    else:
+        def _parse_date(s):
+            try:
+                return datetime.strptime(str(s), "%Y-%m-%d")
+            except Exception:
+                return datetime.min
 
-        st.session_state[flash_key] = {
-            "ok": True,
-            "msg": "¡Parte diario registrado y PDF subido a Google Drive correctamente!",
-            "link": link,
-            "err": None
-        }
+        avances_sorted = sorted(avances, key=lambda r: _parse_date(r.get("fecha")), reverse=True)
 
-    except Exception:
-        st.session_state[flash_key] = {
-            "ok": False,
-            "msg": "Parte diario registrado, pero falló la subida a Drive.",
-            "link": None,
-            "err": traceback.format_exc()
-        }
+        for row in avances_sorted:
+            fecha_txt = row.get("fecha", "")
+            with st.expander(f"Avance del {fecha_txt} - Responsable: {row.get('responsable','')} ({row.get('avance',0)}%)"):
+                st.write(f"*Observaciones:* {row.get('obs','')}")
+                fotos_row = row.get("fotos", []) or []
+                if fotos_row:
+                    cols = st.columns(min(len(fotos_row), 3))
+                    for i, foto_path in enumerate(fotos_row):
+                        with cols[i % 3]:
 
-    st.session_state[reset_flag_key] = True
-    st.rerun()
+                            if os.path.exists(foto_path):
+                                st.image(foto_path, caption=os.path.basename(foto_path), use_container_width=True)
+                            else:
+                                st.warning(f"No se encontró la imagen: {foto_path}")
 
-# =========================
-# Historial
-# =========================
-st.header("Historial de Avances")
 
-avances = datos.get("avance", [])
-if not avances:
-    st.info("No hay partes diarios registrados para esta obra aún.")
-else:
-    def _parse_date(s):
-        try:
-            return datetime.strptime(str(s), "%Y-%m-%d")
-        except Exception:
-            return datetime.min
-
-    avances_sorted = sorted(avances, key=lambda r: _parse_date(r.get("fecha")), reverse=True)
-
-    for row in avances_sorted:
-        fecha_txt = row.get("fecha", "")
-        with st.expander(f"Avance del {fecha_txt} - Responsable: {row.get('responsable','')} ({row.get('avance',0)}%)"):
-            st.write(f"*Observaciones:* {row.get('obs','')}")
-            fotos_row = row.get("fotos", []) or []
-            if fotos_row:
-                cols = st.columns(min(len(fotos_row), 3))
-                for i, foto_path in enumerate(fotos_row):
-                    with cols[i % 3]:
-
-                        if os.path.exists(foto_path):
-                            st.image(foto_path, caption=os.path.basename(foto_path), use_container_width=True)
-                        else:
-                            st.warning(f"No se encontró la imagen: {foto_path}")
+seccion_historial()
@@ -0,0 +1,94 @@
+# benchmarks/bench_caja_chica.py
+# Uso: python benchmarks/bench_caja_chica.py [n_movimientos]
+import os
+import sys
+import tempfile
+import time
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import caja_chica as cc  # noqa: E402
+
+
+def generar_movimientos(n, seed=7):
+    rnd = random.Random(seed)
+    inicio = datetime(2023, 1, 1)
+    usuarios = [f"pasante-obra{i}" for i in range(20)] + ["jefe"]
+    categorias = ["Viáticos", "Transporte", "Materiales menores", "Limpieza/oficina", "Imprevistos", "Otros"]
+    filas = []
+    for _ in range(n):
+        fecha = inicio + timedelta(minutes=rnd.randint(0, 3 * 365 * 24 * 60))
+        if rnd.random() < 0.1:
+            filas.append({
+                "fecha": fecha.strftime(cc.FORMATO_FECHA), "usuario": "jefe", "tipo": "ingreso",
+                "monto": round(rnd.uniform(500, 5000), 2), "descripcion": "Reposición",
+                "categoria": "Reposición fondo", "comprobante": "", "estado": "Aprobado",
+                "aprobado_por": "jefe", "fecha_aprobacion": fecha.strftime(cc.FORMATO_FECHA)
+            })
+            continue
+        estado = rnd.choice(["Pendiente", "Aprobado", "Aprobado", "Rechazado"])
+        decision = fecha + timedelta(hours=rnd.uniform(0.5, 96)) if estado != "Pendiente" else None
+        filas.append({
+            "fecha": fecha.strftime(cc.FORMATO_FECHA), "usuario": rnd.choice(usuarios), "tipo": "egreso",
+            "monto": round(rnd.uniform(5, 400), 2), "descripcion": "Gasto", "categoria": rnd.choice(categorias),
+            "comprobante": "", "estado": estado, "aprobado_por": "jefe" if estado == "Aprobado" else "",
+            "fecha_aprobacion": decision.strftime(cc.FORMATO_FECHA) if decision else ""
+        })
+    return pd.DataFrame(filas, columns=cc.COLUMNAS)
+
+
+def medir(nombre, fn, repeticiones=3):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t0)
+    print(f"{nombre:<45} {min(tiempos) * 1000:10.1f} ms")
+
+
+def totales_con_mascaras():
+    df = cc.cargar_movimientos()
+    ingresos = df[df["tipo"] == "ingreso"]["monto"].sum()
+    egresos = df[(df["tipo"] == "egreso") & (df["estado"] == "Aprobado")]["monto"].sum()
+    return ingresos, egresos, ingresos - egresos
+
+
+def reporte_desde_cero():
+    return cc.reporte_mensual(cc._filas_resumen(cc.cargar_movimientos()))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        os.makedirs(cc.COMPROBANTES_DIR, exist_ok=True)
+        generar_movimientos(n).to_csv(cc.DATA_FILE, index=False)
+        print(f"{n:,} movimientos")
+
+        medir("reconstruir_resumen (groupby vectorizado)", cc.reconstruir_resumen)
+        medir("totales con máscaras (anterior)", totales_con_mascaras)
+        medir("calcular_totales (resumen)", cc.calcular_totales)
+        medir("reporte recalculando desde el CSV", reporte_desde_cero)
+        medir("reporte_mensual (resumen persistido)", cc.reporte_mensual)
+
+        mov = {
+            "fecha": datetime.now().strftime(cc.FORMATO_FECHA), "usuario": "pasante-obra1", "tipo": "egreso",
+            "monto": 12.5, "descripcion": "bench", "categoria": "Otros", "comprobante": "",
+            "estado": "Pendiente", "aprobado_por": "", "fecha_aprobacion": ""
+        }
+        medir("guardar_movimiento (incremental)", lambda: cc.guardar_movimiento(mov))
+        ultimo = len(cc.cargar_movimientos()) - 1
+        medir("actualizar_estado (incremental)", lambda: cc.actualizar_estado(ultimo, "Aprobado", "jefe"), 1)
+
+        # El resumen incremental debe coincidir con uno reconstruido desde cero
+        incremental = cc.cargar_resumen().set_index(cc.CLAVE_RESUMEN).sort_index()
+        completo = cc.reconstruir_resumen().set_index(cc.CLAVE_RESUMEN).sort_index()
+        diff = (incremental["monto"] - completo["monto"]).abs().max()
+        print(f"diferencia máxima resumen incremental vs completo: {diff:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_pdf_fotos.py
+# Uso: python benchmarks/bench_pdf_fotos.py [n_fotos]
+#
+# Compara, por foto, el camino directo (JPEG embebido como DCT) con el camino
+# que decodifica y recodifica la imagen: tiempo de CPU y bytes en el PDF.
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from PIL import Image
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import parte_pdf  # noqa: E402
+
+
+def foto_sintetica(ruta, rnd, ancho=1600, alto=1200):
+    # Ruido suave para que el JPEG pese como una foto real y no como un color plano
+    base = Image.effect_noise((ancho // 8, alto // 8), 60).convert("RGB")
+    tinte = Image.new("RGB", base.size, tuple(rnd.randint(0, 255) for _ in range(3)))
+    img = Image.blend(base, tinte, 0.5).resize((ancho, alto), Image.BILINEAR)
+    img.save(ruta, format="JPEG", quality=85)
+
+
+def pdf_una_foto(ruta, permitir_directo):
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    fuente, iw, ih = parte_pdf.preparar_foto(ruta, permitir_directo=permitir_directo)
+    escala = min((A4[0] - 4 * cm) / iw, 7.5 * cm / ih)
+    c.drawImage(fuente, 2 * cm, 10 * cm, width=iw * escala, height=ih * escala,
+                preserveAspectRatio=True, mask=None if isinstance(fuente, str) else "auto")
+    c.save()
+    return len(buf.getvalue())
+
+
+def medir(rutas, permitir_directo):
+    cpu = []
+    tam = []
+    for ruta in rutas:
+        t0 = time.process_time()
+        tam.append(pdf_una_foto(ruta, permitir_directo))
+        cpu.append(time.process_time() - t0)
+    return sum(cpu) / len(cpu), sum(tam) / len(tam)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rnd = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        rutas = []
+        for i in range(n):
+            ruta = os.path.join(tmp, f"foto_{i}.jpg")
+            foto_sintetica(ruta, rnd)
+            rutas.append(ruta)
+
+        directas = sum(1 for r in rutas if parte_pdf._jpeg_directo(r))
+        fuente_kb = sum(os.path.getsize(r) for r in rutas) / len(rutas) / 1024
+
+        cpu_dir, tam_dir = medir(rutas, True)
+        cpu_rec, tam_rec = medir(rutas, False)
+
+        print(f"{n} fotos 1600x1200 | {directas} aptas para el camino directo | JPEG fuente {fuente_kb:.0f} KB")
+        print(f"{'camino':<14}{'CPU ms/foto':>14}{'PDF KB/foto':>14}")
+        print(f"{'directo (DCT)':<14}{cpu_dir * 1000:>14.1f}{tam_dir / 1024:>14.0f}")
+        print(f"{'recodificado':<14}{cpu_rec * 1000:>14.1f}{tam_rec / 1024:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_serie_gastos.py
+# Uso: python benchmarks/bench_serie_gastos.py [n_gastos] [n_consultas]
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import serie_gastos as sg  # noqa: E402
+
+
+def generar_gastos(n, seed=11):
+    rnd = random.Random(seed)
+    inicio = date(2022, 1, 1)
+    gastos = []
+    for _ in range(n):
+        fecha = inicio + timedelta(days=rnd.randint(0, 3 * 365))
+        gastos.append({"fecha": str(fecha), "tipo": "Materiales", "monto": round(rnd.uniform(1, 900), 2)})
+    return gastos
+
+
+def rango_lineal(gastos, desde, hasta):
+    # Lo que haría la app sin índice: recorrer y comparar `fecha` como texto
+    total = 0.0
+    for g in gastos:
+        f = str(g.get("fecha", ""))
+        if desde <= f <= hasta:
+            total += float(g.get("monto", 0) or 0)
+    return total
+
+
+def totales_lineal(gastos, hoy_str):
+    # Lo que hacía el semáforo: gasto de hoy y acumulado recorriendo todos los gastos
+    diario = acumulado = 0.0
+    for g in gastos:
+        m = float(g.get("monto", 0) or 0)
+        acumulado += m
+        if str(g.get("fecha", "")) == hoy_str:
+            diario += m
+    return diario, acumulado
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_consultas = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    gastos = generar_gastos(n)
+    rnd = random.Random(3)
+    rangos = []
+    for _ in range(n_consultas):
+        a = date(2022, 1, 1) + timedelta(days=rnd.randint(0, 3 * 365))
+        b = a + timedelta(days=rnd.randint(0, 120))
+        rangos.append((str(a), str(b)))
+
+    t0 = time.perf_counter()
+    indice = sg.construir_indice(gastos)
+    t_construir = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    lineal = [rango_lineal(gastos, a, b) for a, b in rangos]
+    t_lineal = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    binario = [sg.gasto_en_rango(indice, a, b) for a, b in rangos]
+    t_binario = time.perf_counter() - t0
+
+    diff = max(abs(x - y) for x, y in zip(lineal, binario))
+
+    ultimo = date.fromordinal(indice["dias"][-1])
+    t0 = time.perf_counter()
+    tot_lineal = totales_lineal(gastos, str(ultimo))
+    t_tot_lineal = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    tot_indice = (sg.gasto_en_rango(indice, ultimo, ultimo), sg.gasto_total(indice))
+    t_tot_indice = time.perf_counter() - t0
+    diff = max(diff, *(abs(x - y) for x, y in zip(tot_lineal, tot_indice)))
+
+    t0 = time.perf_counter()
+    for i in range(1000):
+        sg.agregar_gasto(indice, ultimo, 10.0)
+    t_incremental = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    sg.proyeccion_consumo(indice, indice["acumulado"][-1] * 1.2, ultimo)
+    t_proy = time.perf_counter() - t0
+
+    print(f"{n:,} gastos en {len(indice['dias']):,} días | {n_consultas} consultas de rango")
+    print(f"{'construir_indice':<34}{t_construir * 1000:10.1f} ms")
+    print(f"{'rango: escaneo lineal':<34}{t_lineal / n_consultas * 1000:10.3f} ms/consulta")
+    print(f"{'rango: búsqueda binaria':<34}{t_binario / n_consultas * 1000:10.4f} ms/consulta")
+    print(f"{'semáforo: totales lineales':<34}{t_tot_lineal * 1000:10.3f} ms")
+    print(f"{'semáforo: totales del índice':<34}{t_tot_indice * 1000:10.4f} ms")
+    print(f"{'agregar_gasto (día actual)':<34}{t_incremental / 1000 * 1e6:10.2f} µs/gasto")
+    print(f"{'proyeccion_consumo':<34}{t_proy * 1e6:10.2f} µs")
+    print(f"diferencia máxima lineal vs índice: {diff:.6f}")
+
+
+if __name__ == "__main__":
+    main()
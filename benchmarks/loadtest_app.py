@@ -0,0 +1,926 @@
+# benchmarks/loadtest_app.py
+# Prueba de carga con sesiones concurrentes de Streamlit (AppTest).
+#
+# Uso: python benchmarks/loadtest_app.py --pasantes 8 --jefes 2 --partes 3 --egresos 3
+#      python benchmarks/loadtest_app.py --duplicados 4
+#      python benchmarks/loadtest_app.py --reruns 50
+#
+# --reruns no usa AppTest (siempre re-ejecuta el script completo): levanta un
+# `streamlit run` real y mide por websocket qué secciones se vuelven a ejecutar.
+#
+# Cada sesión corre app.py en un AppTest propio y en su propio proceso: AppTest.run()
+# cambia globales del proceso (Runtime._instance, st.secrets), así que dos AppTest
+# en hilos del mismo proceso se rompen entre sí. Todos los procesos trabajan sobre
+# el mismo directorio temporal (obras/ y caja_chica/). La subida a Apps Script se
+# reemplaza por un servidor HTTP local que responde como el script real, y las
+# fotos/comprobantes se inyectan como archivos sintéticos en lugar del widget.
+#
+# --duplicados primero hace competir N procesos por el mismo token llamando directo
+# a envios.reclamar_envio/registrar_resultado (con reclamos vencidos y liberados),
+# luego repite el envío doble con N sesiones AppTest y por último toca ENVIAR dos
+# veces seguidas en una misma sesión contra un `streamlit run` real.
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import streamlit as st
+from PIL import Image
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from streamlit.testing.v1 import AppTest
+
+try:
+    from websockets.sync.client import connect
+except ImportError:  # las versiones de streamlit sobre tornado no la instalan; solo la usa --reruns
+    connect = None
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILE = os.path.join(REPO_DIR, "app.py")
+sys.path.insert(0, REPO_DIR)
+
+OBRAS_PRUEBA = ["rinconada", "pachacutec"]
+USERS = {
+    "jefe_user": "jefe",
+    "jefe_pass": "jefe-pass",
+    "pasante_user_prefix": "pasante",
+    "pasante_pass": "pasante-pass"
+}
+TIMEOUT_RUN = 180
+
+
+# =========================
+# Subida local (stand-in de Apps Script)
+# =========================
+class SubidaLocal:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subidas = []
+        subida = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                largo = int(self.headers.get("Content-Length", 0))
+                try:
+                    payload = json.loads(self.rfile.read(largo))
+                    nombre = payload.get("filename", "")
+                    with subida.lock:
+                        subida.subidas.append(nombre)
+                    cuerpo = {"ok": True, "url": f"http://localhost/drive/{nombre}"}
+                except Exception as e:
+                    cuerpo = {"ok": False, "error": str(e)}
+                datos = json.dumps(cuerpo).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/exec"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def cerrar(self):
+        self.server.shutdown()
+
+
+# =========================
+# Archivos sintéticos
+# =========================
+class ArchivoSintetico(io.BytesIO):
+    """Imita el UploadedFile de Streamlit (name, type, size, getbuffer, read)."""
+
+    def __init__(self, nombre, datos, tipo):
+        super().__init__(datos)
+        self.name = nombre
+        self.type = tipo
+        self.size = len(datos)
+
+
+def foto_sintetica(rnd, lado=1600):
+    img = Image.new("RGB", (lado, lado * 3 // 4), tuple(rnd.randint(0, 255) for _ in range(3)))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def _file_uploader_sintetico(label, *args, accept_multiple_files=False, **kwargs):
+    # El navegador no existe en AppTest: cada sesión deja sus archivos en session_state
+    clave = "_carga_fotos" if accept_multiple_files else "_carga_comprobante"
+    archivos = st.session_state.get(clave) or []
+    nuevos = [ArchivoSintetico(n, d, t) for n, d, t in archivos]
+    if accept_multiple_files:
+        return nuevos
+    return nuevos[0] if nuevos else None
+
+
+class ErroresScript(logging.Handler):
+    """Errores del hilo del script que AppTest no expone en at.exception."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.mensajes = []
+
+    def emit(self, record):
+        self.mensajes.append(record.getMessage())
+
+
+# Aprobaciones que realmente cambiaron una fila en este proceso: con varios jefes,
+# un clic sobre una fila que otro ya aprobó no cuenta.
+aprobaciones_reales = [0]
+
+
+def _contar_aprobaciones():
+    import caja_chica
+
+    original = caja_chica.actualizar_estado
+
+    def actualizar_estado(idx, estado, usuario=""):
+        cambio = original(idx, estado, usuario)
+        if cambio and estado == "Aprobado":
+            aprobaciones_reales[0] += 1
+        return cambio
+
+    caja_chica.actualizar_estado = actualizar_estado
+
+
+def preparar_proceso(trabajo):
+    os.chdir(trabajo)
+    st.file_uploader = _file_uploader_sintetico
+    _contar_aprobaciones()
+    errores = ErroresScript()
+    logging.getLogger("streamlit").addHandler(errores)
+
+    def hilo_muerto(info):
+        errores.mensajes.append(f"{info.exc_type.__name__}: {info.exc_value}")
+
+    threading.excepthook = hilo_muerto
+    return errores
+
+
+# =========================
+# Sesiones
+# =========================
+class Sesion:
+    def __init__(self, nombre, usuario, password, url_subida, metricas, errores_script):
+        self.nombre = nombre
+        self.metricas = metricas
+        self.errores_script = errores_script
+        self.at = AppTest.from_file(APP_FILE, default_timeout=TIMEOUT_RUN)
+        self.at.secrets["users"] = USERS
+        self.at.secrets["apps_script"] = {"upload_url": url_subida, "token": "carga", "folder_id": "local"}
+        self.usuario = usuario
+        self.password = password
+
+    def accion(self, nombre, preparar=None):
+        if preparar:
+            preparar(self.at)
+        self.errores_script.mensajes.clear()
+        t0 = time.perf_counter()
+        self.at.run()
+        segundos = time.perf_counter() - t0
+
+        # Un run con excepción o con el hilo del script caído es una acción fallida:
+        # no cuenta para las latencias
+        if self.at.exception:
+            raise RuntimeError(f"{self.nombre}/{nombre}: {self.at.exception[0].value}")
+        if self.errores_script.mensajes:
+            raise RuntimeError(f"{self.nombre}/{nombre}: {self.errores_script.mensajes[0]}")
+        self.metricas.registrar(nombre, segundos)
+        return self.at
+
+    def boton(self, etiqueta):
+        for b in list(self.at.button) + list(self.at.sidebar.button):
+            if b.label == etiqueta:
+                return b
+        raise LookupError(f"{self.nombre}: no se encontró el botón '{etiqueta}'")
+
+    def login(self):
+        self.accion("abrir")
+
+        def preparar(at):
+            at.text_input(key="user").input(self.usuario)
+            at.text_input(key="password").input(self.password)
+            self.boton("INGRESAR").click()
+
+        self.accion("login", preparar)
+
+    def enviar_parte(self, rnd, antes_de_enviar=None):
+        def llenar(at):
+            for ni in at.number_input:
+                if ni.key and ni.key.startswith("mon_"):
+                    ni.set_value(float(rnd.randint(0, 50) * 10))
+            for ti in at.text_input:
+                if ti.key and ti.key.startswith("det_"):
+                    ti.input(f"detalle {rnd.randint(1, 999)}")
+
+        self.accion("llenar_gastos", llenar)
+
+        def enviar(at):
+            at.session_state["_carga_fotos"] = [
+                (f"foto_{i}.jpg", foto_sintetica(rnd), "image/jpeg") for i in range(3)
+            ]
+            if antes_de_enviar:
+                antes_de_enviar(at)
+            self.boton("ENVIAR PARTE DIARIO").click()
+
+        at = self.accion("enviar_parte", enviar)
+        at.session_state["_carga_fotos"] = []
+        return any("registrado" in str(s.value) for s in at.success) or \
+            any("registrado" in str(w.value) for w in at.warning)
+
+    def abrir_caja(self):
+        self.accion("abrir_caja", lambda at: self.boton("Caja Chica").click())
+
+    def registrar_egreso(self, rnd):
+        def llenar(at):
+            at.number_input(key="monto_egr").set_value(round(rnd.uniform(5, 300), 2))
+            at.text_input(key="desc_egr").input("gasto de carga")
+            at.session_state["_carga_comprobante"] = [("boleta.jpg", foto_sintetica(rnd, 900), "image/jpeg")]
+            self.boton("Registrar Egreso").click()
+
+        self.accion("registrar_egreso", llenar)
+        self.at.session_state["_carga_comprobante"] = []
+
+    def aprobar_pendiente(self):
+        botones = [b for b in self.at.button if b.key and b.key.startswith("apr_")]
+        if not botones:
+            self.accion("refrescar_aprobaciones")
+            return False
+        antes = aprobaciones_reales[0]
+        self.accion("aprobar", lambda at: botones[0].click())
+        return aprobaciones_reales[0] > antes
+
+
+class Metricas:
+    def __init__(self):
+        self.tiempos = defaultdict(list)
+        self.errores = []
+
+    def registrar(self, accion, segundos):
+        self.tiempos[accion].append(segundos)
+
+    def error(self, msg):
+        self.errores.append(msg)
+
+
+def percentil(valores, p):
+    orden = sorted(valores)
+    if not orden:
+        return 0.0
+    k = min(len(orden) - 1, max(0, int(round(p / 100.0 * (len(orden) - 1)))))
+    return orden[k]
+
+
+# =========================
+# Escenarios
+# =========================
+def flujo_pasante(i, args, url, metricas, esperado, errores_script):
+    rnd = random.Random(args.semilla + i)
+    obra = OBRAS_PRUEBA[i % len(OBRAS_PRUEBA)]
+    ses = Sesion(f"pasante{i}", f"{USERS['pasante_user_prefix']}-{obra}", USERS["pasante_pass"], url, metricas,
+                 errores_script)
+    try:
+        ses.login()
+        for _ in range(args.partes):
+            if ses.enviar_parte(rnd):
+                esperado.sumar(f"partes:{obra}")
+        ses.abrir_caja()
+        for _ in range(args.egresos):
+            ses.registrar_egreso(rnd)
+            esperado.sumar("egresos")
+    except Exception:
+        metricas.error(f"pasante{i}: {traceback.format_exc(limit=3)}")
+
+
+def flujo_jefe(i, args, url, metricas, esperado, errores_script, fin_pasantes):
+    ses = Sesion(f"jefe{i}", USERS["jefe_user"], USERS["jefe_pass"], url, metricas, errores_script)
+    try:
+        ses.login()
+        ses.abrir_caja()
+        limite = args.pasantes * args.egresos
+        while esperado.valores["aprobaciones"] < limite:
+            terminado = fin_pasantes.is_set()
+            if ses.aprobar_pendiente():
+                esperado.sumar("aprobaciones")
+            elif terminado:
+                break
+            else:
+                time.sleep(0.2)
+    except Exception:
+        metricas.error(f"jefe{i}: {traceback.format_exc(limit=3)}")
+
+
+def flujo_duplicado(i, args, url, metricas, exitos, errores_script, obra, token, barrera):
+    # Varias sesiones con el mismo token de formulario envían a la vez (doble toque / reenvío)
+    rnd = random.Random(i)
+    ses = Sesion(f"duplicado{i}", f"{USERS['pasante_user_prefix']}-{obra}", USERS["pasante_pass"], url, metricas,
+                 errores_script)
+    token_key = f"pd_token_{obra}_{date.today()}_v0"
+
+    def mismo_token(at):
+        at.session_state[token_key] = token
+        barrera.wait()
+
+    try:
+        ses.login()
+        if ses.enviar_parte(rnd, mismo_token):
+            exitos.sumar("sesiones")
+    except Exception:
+        metricas.error(f"duplicado{i}: {traceback.format_exc(limit=3)}")
+
+
+class Contador:
+    def __init__(self):
+        self.valores = defaultdict(int)
+
+    def sumar(self, clave, n=1):
+        self.valores[clave] += n
+
+
+def ejecutar_sesion(flujo, i, args, trabajo, url, *extra):
+    """Punto de entrada de cada proceso: corre un flujo y devuelve sus mediciones."""
+    errores_script = preparar_proceso(trabajo)
+    metricas = Metricas()
+    esperado = Contador()
+    flujo(i, args, url, metricas, esperado, errores_script, *extra)
+    return {"tiempos": dict(metricas.tiempos), "errores": metricas.errores, "contadores": dict(esperado.valores)}
+
+
+def combinar(resultados):
+    metricas = Metricas()
+    esperado = Contador()
+    for r in resultados:
+        for accion, tiempos in r["tiempos"].items():
+            metricas.tiempos[accion].extend(tiempos)
+        metricas.errores.extend(r["errores"])
+        for clave, n in r["contadores"].items():
+            esperado.sumar(clave, n)
+    return metricas, esperado
+
+
+def pool_procesos(n):
+    return ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn"))
+
+
+# =========================
+# Integridad
+# =========================
+def verificar_integridad(esperado, subida, caja=True):
+    problemas = []
+
+    for obra in OBRAS_PRUEBA:
+        ruta = os.path.join("obras", f"{obra}.json")
+        if not os.path.exists(ruta) and not esperado.valores[f"partes:{obra}"]:
+            continue
+        if not os.path.exists(ruta):
+            problemas.append(f"{ruta}: no existe")
+            continue
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+        except Exception as e:
+            problemas.append(f"{ruta}: JSON inválido ({e})")
+            continue
+
+        n_partes = len(datos.get("avance", []))
+        if n_partes != esperado.valores[f"partes:{obra}"]:
+            problemas.append(f"{ruta}: {n_partes} partes guardados, se enviaron {esperado.valores[f'partes:{obra}']}")
+
+        suma = sum(float(g.get("monto", 0) or 0) for g in datos.get("gastos", []))
+        if abs(suma - float(datos.get("gasto_acumulado", 0.0))) > 0.005:
+            problemas.append(f"{ruta}: gasto_acumulado {datos.get('gasto_acumulado')} != suma de gastos {suma:.2f}")
+
+        for av in datos.get("avance", []):
+            for foto in av.get("fotos", []):
+                if not os.path.exists(foto):
+                    problemas.append(f"{ruta}: foto faltante {foto}")
+
+    total_partes = sum(v for k, v in esperado.valores.items() if k.startswith("partes:"))
+    if len(subida.subidas) != total_partes:
+        problemas.append(f"subidas: {len(subida.subidas)} PDFs recibidos, se enviaron {total_partes} partes")
+
+    if not caja:
+        return problemas
+
+    import caja_chica as cc
+    try:
+        df = pd.read_csv(cc.DATA_FILE, dtype=str, keep_default_na=False)
+        egresos = df[df["tipo"] == "egreso"]
+        if len(egresos) != esperado.valores["egresos"]:
+            problemas.append(f"{cc.DATA_FILE}: {len(egresos)} egresos, se registraron {esperado.valores['egresos']}")
+        aprobados = int((egresos["estado"] == "Aprobado").sum())
+        if aprobados != esperado.valores["aprobaciones"]:
+            problemas.append(f"{cc.DATA_FILE}: {aprobados} aprobados, se aprobaron {esperado.valores['aprobaciones']}")
+
+        resumen = cc.cargar_resumen().set_index(cc.CLAVE_RESUMEN)["cantidad"].sort_index()
+        completo = cc._filas_resumen(cc._leer_movimientos()).set_index(cc.CLAVE_RESUMEN)["cantidad"].sort_index()
+        if not resumen.equals(completo):
+            problemas.append(f"{cc.RESUMEN_FILE}: no coincide con {cc.DATA_FILE}")
+    except Exception as e:
+        problemas.append(f"{cc.DATA_FILE}: no se pudo leer ({e})")
+
+    return problemas
+
+
+# =========================
+# Reruns sobre un servidor real
+# =========================
+# AppTest siempre re-ejecuta el script completo, así que no sirve para medir
+# fragmentos. Esta prueba levanta `streamlit run` y habla el protocolo del
+# navegador por websocket: cada widget se envía con el fragment_id que el servidor
+# le asignó, y los deltas recibidos dicen qué secciones se volvieron a ejecutar.
+def poblar_obra(obra, dias, rnd):
+    """Historial de `dias` días con 3 fotos por parte y un gasto por categoría."""
+    os.makedirs("obras/fotos", exist_ok=True)
+    fotos = []
+    for i in range(6):
+        ruta = f"obras/fotos/{obra}_historial_{i}.jpg"
+        with open(ruta, "wb") as f:
+            f.write(foto_sintetica(rnd))
+        fotos.append(ruta)
+
+    avance, gastos = [], []
+    inicio = date.today() - timedelta(days=dias)
+    for d in range(dias):
+        fecha = str(inicio + timedelta(days=d))
+        avance.append({"fecha": fecha, "responsable": f"pasante-{obra}", "avance": rnd.randint(0, 5),
+                       "obs": "sin novedad", "fotos": rnd.sample(fotos, 3)})
+        for cat in ["Materiales", "Mano de obra", "Equipos", "Transporte", "Otros"]:
+            gastos.append({"fecha": fecha, "responsable": f"pasante-{obra}", "tipo": cat,
+                           "detalle": "historial", "monto": float(rnd.randint(1, 50) * 10)})
+    with open(f"obras/{obra}.json", "w", encoding="utf-8") as f:
+        json.dump({"avance": avance, "gastos": gastos, "presupuesto_total": 0.0, "gasto_acumulado": 0.0}, f)
+
+
+class ServidorApp:
+    def __init__(self, trabajo, url_subida):
+        os.makedirs(os.path.join(trabajo, ".streamlit"), exist_ok=True)
+        with open(os.path.join(trabajo, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+            f.write("[users]\n" + "".join(f'{k} = "{v}"\n' for k, v in USERS.items()))
+            f.write(f'[apps_script]\nupload_url = "{url_subida}"\ntoken = "carga"\nfolder_id = "local"\n')
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.puerto = s.getsockname()[1]
+        self.log = open(os.path.join(trabajo, "streamlit.log"), "w")
+        self.proceso = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", APP_FILE, "--server.headless", "true",
+             "--server.address", "127.0.0.1", "--server.port", str(self.puerto),
+             "--server.enableXsrfProtection", "false", "--server.fileWatcherType", "none",
+             "--browser.gatherUsageStats", "false"],
+            cwd=trabajo, stdout=self.log, stderr=subprocess.STDOUT)
+
+        limite = time.monotonic() + 60
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.puerto}/_stcore/health", timeout=2):
+                    break
+            except OSError:
+                if self.proceso.poll() is not None or time.monotonic() > limite:
+                    self.cerrar()
+                    raise RuntimeError(f"streamlit no arrancó (ver {self.log.name})")
+                time.sleep(0.3)
+
+    def cerrar(self):
+        self.proceso.terminate()
+        self.proceso.wait(timeout=30)
+        self.log.close()
+
+
+class SesionNavegador:
+    """Sesión por websocket que envía BackMsg como el frontend y cuenta deltas por sección."""
+
+    def __init__(self, ws, metricas):
+        self.ws = ws
+        self.metricas = metricas
+        self.widgets = {}      # clave del widget -> (id, fragment_id)
+        self.valores = {}      # id -> WidgetState vigente (se reenvía en cada rerun, como el navegador)
+        self.secciones = {"": "página"}
+        self.deltas = defaultdict(lambda: defaultdict(list))
+
+    def _recordar_widget(self, elemento, fragment_id):
+        proto = getattr(elemento, elemento.WhichOneof("type"))
+        wid = getattr(proto, "id", "")
+        if not isinstance(wid, str) or not wid.startswith("$$ID-"):
+            return
+        # "$$ID-<hash>-<key>" ("None" sin key); los botones se buscan además por etiqueta
+        clave = wid.split("-", 2)[2]
+        etiqueta = getattr(proto, "label", "") if elemento.WhichOneof("type") == "button" else ""
+        if etiqueta:
+            self.widgets[etiqueta] = (wid, fragment_id)
+        if clave != "None":
+            self.widgets[clave] = (wid, fragment_id)
+
+    def _nombre_seccion(self, fragment_id, elemento):
+        tipo = elemento.WhichOneof("type")
+        proto = getattr(elemento, tipo)
+        texto = getattr(proto, "body", "") or getattr(proto, "label", "") or tipo
+        self.secciones[fragment_id] = texto.replace("*", "").strip("# ").split("\n")[0][:24].strip()
+
+    def _mensaje(self, cambios, widget):
+        msg = BackMsg()
+        cliente = msg.rerun_script
+        cliente.SetInParent()
+        if widget is not None:
+            cliente.fragment_id = self.widgets[widget][1]
+        for w in list(self.valores.values()) + list(cambios):
+            cliente.widget_states.widgets.append(w)
+        for w in cambios:
+            if w.WhichOneof("value") != "trigger_value":
+                self.valores[w.id] = w
+        return msg.SerializeToString()
+
+    def _procesar(self, nombre, fwd, por_seccion):
+        if fwd.WhichOneof("type") != "delta" or fwd.delta.WhichOneof("type") != "new_element":
+            return
+        elemento = fwd.delta.new_element
+        fragment_id = fwd.delta.fragment_id
+        if elemento.WhichOneof("type") == "exception":
+            raise RuntimeError(f"{nombre}: {elemento.exception.type}: {elemento.exception.message}")
+        if fragment_id not in self.secciones:
+            self._nombre_seccion(fragment_id, elemento)
+        por_seccion[fragment_id] += 1
+        self._recordar_widget(elemento, fragment_id)
+
+    def _recibir(self, timeout):
+        fwd = ForwardMsg()
+        fwd.ParseFromString(self.ws.recv(timeout=timeout))
+        return fwd
+
+    def accion(self, nombre, cambios=(), widget=None):
+        por_seccion = defaultdict(int)
+        t0 = time.perf_counter()
+        self.ws.send(self._mensaje(cambios, widget))
+        while True:
+            fwd = self._recibir(TIMEOUT_RUN)
+            if fwd.WhichOneof("type") == "script_finished":
+                break
+            self._procesar(nombre, fwd, por_seccion)
+        segundos = time.perf_counter() - t0
+
+        self.metricas.registrar(nombre, segundos)
+        for fragment_id, n in por_seccion.items():
+            self.deltas[nombre][fragment_id].append(n)
+
+    def doble_toque(self, nombre, boton, pausa, silencio=5.0):
+        """Dos clics del mismo botón sin esperar el rerun del primero, como un doble toque."""
+        for _ in range(2):
+            self.ws.send(self._mensaje([self.estado(boton, trigger_value=True)], boton))
+            time.sleep(pausa)
+        # Los reruns encadenados (clic, st.rerun, clic pendiente) terminan cuando el
+        # servidor deja de enviar mensajes un rato después de un script_finished
+        por_seccion = defaultdict(int)
+        terminado = False
+        while True:
+            try:
+                fwd = self._recibir(silencio if terminado else TIMEOUT_RUN)
+            except TimeoutError:
+                if terminado:
+                    return
+                raise
+            tipo = fwd.WhichOneof("type")
+            if tipo == "script_finished":
+                terminado = True
+            elif tipo in ("new_session", "delta"):
+                terminado = False
+            self._procesar(nombre, fwd, por_seccion)
+
+    def estado(self, clave, **valor):
+        w = WidgetState()
+        w.id = self.widgets[clave][0]
+        campo, v = next(iter(valor.items()))
+        setattr(w, campo, v)
+        return w
+
+    def clave(self, prefijo):
+        return next(k for k in self.widgets if k.startswith(prefijo))
+
+
+def poblar_caja(rnd, pendientes, aprobados):
+    """Egresos pendientes con comprobante (para Aprobaciones) e historial aprobado (para Reportes)."""
+    import caja_chica as cc
+
+    inicio = datetime.now() - timedelta(days=365)
+    for i in range(pendientes + aprobados):
+        fecha = (inicio + timedelta(hours=rnd.randint(0, 365 * 24))).strftime(cc.FORMATO_FECHA)
+        pendiente = i < pendientes
+        comprobante = cc.guardar_comprobante(ArchivoSintetico(f"boleta_{i}.jpg", foto_sintetica(rnd, 900), "image/jpeg"))
+        cc.guardar_movimiento({
+            "fecha": fecha, "usuario": f"pasante-{rnd.choice(OBRAS_PRUEBA)}", "tipo": "egreso",
+            "monto": round(rnd.uniform(5, 300), 2), "descripcion": "historial", "categoria": "Otros",
+            "comprobante": comprobante if pendiente else "", "estado": "Pendiente" if pendiente else "Aprobado",
+            "aprobado_por": "" if pendiente else "jefe", "fecha_aprobacion": "" if pendiente else fecha
+        })
+
+
+def reruns_pasante(ses, args, rnd, obra):
+    ses.accion("abrir")
+    ses.accion("login", [ses.estado("user", string_value=f"{USERS['pasante_user_prefix']}-{obra}"),
+                         ses.estado("password", string_value=USERS["pasante_pass"]),
+                         ses.estado("INGRESAR", trigger_value=True)])
+    for _ in range(args.reruns):
+        ses.accion("pagina_completa")
+        monto = ses.clave("mon_")
+        ses.accion("escribir_monto", [ses.estado(monto, double_value=float(rnd.randint(1, 500)))], monto)
+        detalle = ses.clave("det_")
+        ses.accion("escribir_detalle", [ses.estado(detalle, string_value=f"detalle {rnd.randint(1, 999)}")],
+                   detalle)
+
+
+def reruns_jefe(ses, args):
+    ses.accion("caja_abrir")
+    ses.accion("caja_login", [ses.estado("user", string_value=USERS["jefe_user"]),
+                              ses.estado("password", string_value=USERS["jefe_pass"]),
+                              ses.estado("INGRESAR", trigger_value=True)])
+    ses.accion("caja_pagina", [ses.estado("Caja Chica", trigger_value=True)])
+    for i in range(args.reruns):
+        toggle = ses.clave("orig_")
+        ses.accion("caja_ver_original", [ses.estado(toggle, bool_value=i % 2 == 0)], toggle)
+
+
+def prueba_reruns(args, trabajo, subida):
+    if connect is None:
+        print("--reruns necesita el paquete websockets (pip install websockets)")
+        return 1
+    rnd = random.Random(args.semilla)
+    obra = OBRAS_PRUEBA[0]
+    poblar_obra(obra, args.historial, rnd)
+    poblar_caja(rnd, pendientes=20, aprobados=args.historial * 5)
+    metricas = Metricas()
+    sesiones = []
+
+    servidor = ServidorApp(trabajo, subida.url)
+    try:
+        for flujo in (lambda ses: reruns_pasante(ses, args, rnd, obra), lambda ses: reruns_jefe(ses, args)):
+            with connect(f"ws://127.0.0.1:{servidor.puerto}/_stcore/stream", subprotocols=["streamlit"],
+                         max_size=None) as ws:
+                sesiones.append(SesionNavegador(ws, metricas))
+                flujo(sesiones[-1])
+    except Exception:
+        metricas.error(f"reruns: {traceback.format_exc(limit=3)}")
+    finally:
+        servidor.cerrar()
+
+    print(f"\n{args.reruns} repeticiones en {obra} ({args.historial} días de historial) | streamlit run real\n")
+    print(f"{'acción':<20}{'n':>5}{'p50 ms':>9}{'p90 ms':>9}{'máx ms':>9}  elementos por sección (p50)")
+    for ses in sesiones:
+        for accion, por_seccion in ses.deltas.items():
+            tiempos = metricas.tiempos[accion]
+            if not tiempos:
+                continue
+            secciones = ", ".join(f"{ses.secciones[fid]}={percentil(n, 50)}" for fid, n in por_seccion.items())
+            print(f"{accion:<20}{len(tiempos):>5}{percentil(tiempos, 50) * 1000:>9.1f}"
+                  f"{percentil(tiempos, 90) * 1000:>9.1f}{max(tiempos) * 1000:>9.1f}  {secciones}")
+    for err in metricas.errores:
+        print(f"\nERROR {err}")
+    return 1 if metricas.errores else 0
+
+
+def flujo_reclamos(i, trabajo, prefijo, rondas, barrera, fallos):
+    """Proceso que compite por el mismo token en cada ronda llamando directamente a envios."""
+    os.chdir(trabajo)
+    import envios
+
+    vistos = []
+    for r in range(rondas):
+        token = f"{prefijo}_{r}"
+        barrera.wait()
+        reclamos = 0
+        resultado = None
+        while resultado is None:
+            if envios.reclamar_envio(token):
+                reclamos += 1
+                time.sleep(0.05)
+                # En las rondas múltiplo de 3 el primer ganador simula un fallo y libera el reclamo
+                if r % 3 == 0 and fallos.setdefault(r, i) == i:
+                    envios.liberar_envio(token)
+                    resultado = "liberado"
+                    break
+                resultado = {"proceso": i, "ronda": r}
+                envios.registrar_resultado(token, resultado)
+            else:
+                resultado = envios.esperar_resultado(token, timeout=30, intervalo=0.01)
+        vistos.append({"ronda": r, "reclamos": reclamos, "resultado": resultado})
+    return vistos
+
+
+def verificar_reclamos(por_proceso, rondas):
+    """Cada ronda: un solo resultado registrado y todos los procesos ven el mismo."""
+    problemas = []
+    for r in range(rondas):
+        filas = [vistos[r] for vistos in por_proceso]
+        liberados = sum(1 for f in filas if f["resultado"] == "liberado")
+        resultados = [f["resultado"] for f in filas if f["resultado"] != "liberado"]
+        ganadores = {json.dumps(res, sort_keys=True) for res in resultados}
+        reclamos = sum(f["reclamos"] for f in filas)
+        esperados = 2 if r % 3 == 0 else 1
+        if reclamos != esperados:
+            problemas.append(f"ronda {r}: {reclamos} reclamos concedidos, se esperaban {esperados}")
+        if liberados != esperados - 1:
+            problemas.append(f"ronda {r}: {liberados} reclamos liberados, se esperaban {esperados - 1}")
+        if len(ganadores) != 1:
+            problemas.append(f"ronda {r}: {len(ganadores)} resultados distintos ({sorted(ganadores)})")
+    return problemas
+
+
+def prueba_reclamos(args, trabajo):
+    """Varios procesos reales llaman a reclamar_envio/registrar_resultado con el mismo token a la vez."""
+    import envios
+
+    prefijo = f"reclamo_{random.Random(args.semilla).getrandbits(64):x}"
+    # Ronda 0: un reclamo abandonado (inicio vencido) debe poder reclamarse otra vez, una sola vez
+    os.makedirs(envios.ENVIOS_DIR, exist_ok=True)
+    envios._escribir(f"{prefijo}_0", {"estado": "en_proceso", "inicio": "2000-01-01T00:00:00"})
+
+    with multiprocessing.get_context("spawn").Manager() as manager, pool_procesos(args.duplicados) as pool:
+        barrera = manager.Barrier(args.duplicados, timeout=TIMEOUT_RUN)
+        fallos = manager.dict()
+        futuros = [pool.submit(flujo_reclamos, i, trabajo, prefijo, args.rondas, barrera, fallos)
+                   for i in range(args.duplicados)]
+        por_proceso = [fut.result() for fut in futuros]
+
+    problemas = verificar_reclamos(por_proceso, args.rondas)
+    print(f"\n{args.duplicados} procesos x {args.rondas} rondas sobre reclamar_envio/registrar_resultado:",
+          "OK" if not problemas else f"{len(problemas)} problema(s)")
+    for p in problemas:
+        print(f"  - {p}")
+    return problemas
+
+
+MONTO_DOBLE_TOQUE = 123.0
+
+
+def _conteo_envios(subida):
+    avances = gastos = 0
+    for nombre in os.listdir("obras"):
+        if nombre.endswith(".json"):
+            with open(os.path.join("obras", nombre), "r", encoding="utf-8") as f:
+                datos = json.load(f)
+            avances += len(datos.get("avance", []))
+            gastos += sum(1 for g in datos.get("gastos", []) if float(g.get("monto", 0) or 0) == MONTO_DOBLE_TOQUE)
+    tokens = sum(1 for n in os.listdir("obras/envios") if n.endswith(".json")) if os.path.isdir("obras/envios") else 0
+    return {"partes": avances, f"gastos de {MONTO_DOBLE_TOQUE:g}": gastos, "subidas": len(subida.subidas),
+            "tokens": tokens}
+
+
+def prueba_doble_toque(args, trabajo, subida):
+    """Una sola sesión (servidor real) toca ENVIAR dos veces seguidas: debe quedar un solo parte."""
+    if connect is None:
+        print("\ndoble toque: omitido, necesita el paquete websockets")
+        return []
+    problemas = []
+    servidor = ServidorApp(trabajo, subida.url)
+    try:
+        with connect(f"ws://127.0.0.1:{servidor.puerto}/_stcore/stream", subprotocols=["streamlit"],
+                     max_size=None) as ws:
+            ses = SesionNavegador(ws, Metricas())
+            ses.accion("abrir")
+            ses.accion("login", [ses.estado("user", string_value=USERS["jefe_user"]),
+                                 ses.estado("password", string_value=USERS["jefe_pass"]),
+                                 ses.estado("INGRESAR", trigger_value=True)])
+            for pausa in args.pausas_doble_toque:
+                antes = _conteo_envios(subida)
+                monto = ses.clave("mon_")
+                ses.accion("escribir_monto", [ses.estado(monto, double_value=MONTO_DOBLE_TOQUE)], monto)
+                ses.doble_toque("enviar", "ENVIAR PARTE DIARIO", pausa)
+                # El formulario se reseteó en el servidor: no reenviar valores viejos
+                ses.valores.clear()
+                despues = _conteo_envios(subida)
+                for clave, n in despues.items():
+                    if n - antes[clave] != 1:
+                        problemas.append(f"doble toque a {pausa:g} s: {n - antes[clave]} {clave} nuevos, se esperaba 1")
+    except Exception:
+        problemas.append(f"doble toque: {traceback.format_exc(limit=3)}")
+    finally:
+        servidor.cerrar()
+
+    print(f"\ndoble toque en una sesión (pausas {', '.join(f'{p:g} s' for p in args.pausas_doble_toque)}):",
+          "OK" if not problemas else f"{len(problemas)} problema(s)")
+    for p in problemas:
+        print(f"  - {p}")
+    return problemas
+
+
+def prueba_duplicados(args, trabajo, subida):
+    problemas_reclamos = prueba_reclamos(args, trabajo)
+
+    obra = OBRAS_PRUEBA[0]
+    token = f"duplicado_{random.Random(args.semilla).getrandbits(64):x}"
+    with multiprocessing.get_context("spawn").Manager() as manager, pool_procesos(args.duplicados) as pool:
+        barrera = manager.Barrier(args.duplicados, timeout=TIMEOUT_RUN)
+        futuros = [pool.submit(ejecutar_sesion, flujo_duplicado, i, args, trabajo, subida.url, obra, token, barrera)
+                   for i in range(args.duplicados)]
+        metricas, exitos = combinar([fut.result() for fut in futuros])
+
+    # Todas las sesiones deben ver el resultado, pero solo un parte y una subida deben existir
+    esperado = Contador()
+    esperado.sumar(f"partes:{obra}")
+    print(f"\n{args.duplicados} envíos simultáneos del mismo parte | "
+          f"{exitos.valores['sesiones']} sesiones vieron el resultado | {len(subida.subidas)} subida(s)")
+    for err in metricas.errores:
+        print(f"\nERROR {err}")
+    problemas = verificar_integridad(esperado, subida, caja=False)
+    print("\nintegridad:", "OK" if not problemas else f"{len(problemas)} problema(s)")
+    for p in problemas:
+        print(f"  - {p}")
+
+    problemas_toque = prueba_doble_toque(args, trabajo, subida)
+    return 1 if problemas or problemas_reclamos or problemas_toque or metricas.errores else 0
+
+
+# =========================
+# Main
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga con sesiones concurrentes de la app")
+    parser.add_argument("--pasantes", type=int, default=8)
+    parser.add_argument("--jefes", type=int, default=1)
+    parser.add_argument("--partes", type=int, default=2, help="partes diarios por pasante")
+    parser.add_argument("--egresos", type=int, default=2, help="egresos de caja chica por pasante")
+    parser.add_argument("--duplicados", type=int, default=0,
+                        help="en lugar de la carga normal, N sesiones envían el mismo parte a la vez")
+    parser.add_argument("--rondas", type=int, default=30,
+                        help="con --duplicados, rondas de reclamo directo del mismo token entre procesos")
+    parser.add_argument("--pausas-doble-toque", type=float, nargs="+", default=[0.05, 0.3, 0.6, 1.0],
+                        help="con --duplicados, segundos entre los dos toques de ENVIAR en una misma sesión")
+    parser.add_argument("--reruns", type=int, default=0,
+                        help="en lugar de la carga normal, medir N reruns de página y de escritura en el formulario "
+                             "contra un servidor streamlit real")
+    parser.add_argument("--historial", type=int, default=60, help="con --reruns, días de historial de la obra")
+    parser.add_argument("--semilla", type=int, default=2025)
+    parser.add_argument("--conservar", action="store_true", help="no borrar el directorio de datos")
+    args = parser.parse_args()
+
+    trabajo = tempfile.mkdtemp(prefix="carga_app_")
+    os.chdir(trabajo)
+    subida = SubidaLocal()
+
+    try:
+        if args.duplicados:
+            return prueba_duplicados(args, trabajo, subida)
+        if args.reruns:
+            return prueba_reruns(args, trabajo, subida)
+
+        with multiprocessing.get_context("spawn").Manager() as manager, \
+                pool_procesos(args.pasantes + args.jefes) as pool:
+            fin_pasantes = manager.Event()
+            t0 = time.perf_counter()
+            jefes = [pool.submit(ejecutar_sesion, flujo_jefe, i, args, trabajo, subida.url, fin_pasantes)
+                     for i in range(args.jefes)]
+            pasantes = [pool.submit(ejecutar_sesion, flujo_pasante, i, args, trabajo, subida.url)
+                        for i in range(args.pasantes)]
+            resultados = [fut.result() for fut in pasantes]
+            fin_pasantes.set()
+            resultados += [fut.result() for fut in jefes]
+            duracion = time.perf_counter() - t0
+        metricas, esperado = combinar(resultados)
+
+        print(f"\n{args.pasantes} pasantes + {args.jefes} jefes | {duracion:.1f} s | datos en {trabajo}\n")
+        print(f"{'acción':<24}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+        total = 0
+        for accion, tiempos in sorted(metricas.tiempos.items()):
+            total += len(tiempos)
+            print(f"{accion:<24}{len(tiempos):>6}"
+                  f"{percentil(tiempos, 50) * 1000:>10.0f}{percentil(tiempos, 90) * 1000:>10.0f}"
+                  f"{percentil(tiempos, 99) * 1000:>10.0f}{max(tiempos) * 1000:>10.0f}")
+        print(f"\nthroughput: {total / duracion:.1f} reruns/s")
+
+        for err in metricas.errores:
+            print(f"\nERROR {err}")
+
+        problemas = verificar_integridad(esperado, subida)
+        print("\nintegridad:", "OK" if not problemas else f"{len(problemas)} problema(s)")
+        for p in problemas:
+            print(f"  - {p}")
+        return 1 if problemas or metricas.errores else 0
+    finally:
+        subida.cerrar()
+        if not args.conservar:
+            os.chdir(REPO_DIR)
+            shutil.rmtree(trabajo, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,43 +2,342 @@
 import streamlit as st
 import pandas as pd
 import os
+import io
+import hashlib
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from PIL import Image, ImageOps
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # sin pypdfium2 los PDF se muestran sin vista previa
+    pdfium = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se bloquea entre hilos del mismo proceso
+    fcntl = None
 
 DATA_FILE = "caja_chica/movimientos.csv"
+RESUMEN_FILE = "caja_chica/resumen_mensual.csv"
+LOCK_FILE = "caja_chica/.movimientos.lock"
 COMPROBANTES_DIR = "caja_chica/comprobantes"
+PREVIEWS_DIR = "caja_chica/previews"
+
+# Comprobantes: las imágenes se guardan recomprimidas y las vistas previas son
+# JPEG pequeños que el jefe carga en Aprobaciones (el original solo a pedido).
+LADO_MAX_COMPROBANTE = 2000
+LADO_PREVIEW = 480
+CALIDAD_JPEG = 85
+
+FORMATO_FECHA = "%Y-%m-%d %H:%M"
+COLUMNAS = ["fecha", "usuario", "tipo", "monto", "descripcion", "categoria", "comprobante", "estado", "aprobado_por",
+            "fecha_aprobacion"]
+
+# Resumen mensual: una fila por (mes, tipo, estado, categoria, usuario) con sumas
+# que se actualizan en cada alta/aprobación en lugar de recalcular todo el CSV.
+CLAVE_RESUMEN = ["mes", "tipo", "estado", "categoria", "usuario"]
+VALORES_RESUMEN = ["monto", "cantidad", "horas_aprobacion", "con_tiempo"]
+
+
+# Las sesiones de Streamlit son hilos del mismo proceso: el RLock las ordena y el
+# flock protege además de otros procesos. Solo el nivel más externo toma el flock.
+_lock = threading.RLock()
+_bloqueo_local = threading.local()
+
+
+@contextmanager
+def _bloqueo():
+    with _lock:
+        nivel = getattr(_bloqueo_local, "nivel", 0)
+        _bloqueo_local.nivel = nivel + 1
+        archivo = None
+        try:
+            if nivel == 0 and fcntl is not None:
+                os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+                archivo = open(LOCK_FILE, "a")
+                fcntl.flock(archivo, fcntl.LOCK_EX)
+            yield
+        finally:
+            _bloqueo_local.nivel = nivel
+            if archivo is not None:
+                archivo.close()
+
+
+def _escribir_csv(df, ruta):
+    _escribir(ruta, df.to_csv(index=False).encode("utf-8"))
+
 
 def inicializar_caja():
     os.makedirs(COMPROBANTES_DIR, exist_ok=True)
-    if not os.path.exists(DATA_FILE):
-        columnas = ["fecha", "usuario", "tipo", "monto", "descripcion", "categoria", "comprobante", "estado", "aprobado_por"]
-        pd.DataFrame(columns=columnas).to_csv(DATA_FILE, index=False)
+    os.makedirs(PREVIEWS_DIR, exist_ok=True)
+    with _bloqueo():
+        if not os.path.exists(DATA_FILE):
+            _escribir_csv(pd.DataFrame(columns=COLUMNAS), DATA_FILE)
+        elif list(pd.read_csv(DATA_FILE, nrows=0).columns) != COLUMNAS:
+            # CSV de una versión anterior: agregar columnas faltantes una sola vez
+            _escribir_csv(_leer_movimientos(), DATA_FILE)
+        if not os.path.exists(RESUMEN_FILE):
+            reconstruir_resumen()
+
+
+def _leer_movimientos():
+    df = pd.read_csv(
+        DATA_FILE,
+        dtype={c: str for c in COLUMNAS if c != "monto"},
+        keep_default_na=False,
+        na_values={"monto": [""]}
+    )
+    df = df.reindex(columns=COLUMNAS, fill_value="")
+    df["monto"] = pd.to_numeric(df["monto"], errors="coerce").fillna(0.0).astype("float64")
+    return df
+
+
+def _contar_movimientos():
+    # Conteo barato de filas (las descripciones son de una sola línea)
+    with open(DATA_FILE, "rb") as f:
+        lineas = sum(bloque.count(b"\n") for bloque in iter(lambda: f.read(1 << 20), b""))
+    return max(lineas - 1, 0)
+
 
 def cargar_movimientos():
     inicializar_caja()
-    return pd.read_csv(DATA_FILE)
+    with _bloqueo():
+        return _leer_movimientos()
+
 
 def guardar_movimiento(mov):
-    df = cargar_movimientos()
-    df = pd.concat([df, pd.DataFrame([mov])], ignore_index=True)
-    df.to_csv(DATA_FILE, index=False)
+    inicializar_caja()
+    fila = pd.DataFrame([mov]).reindex(columns=COLUMNAS, fill_value="")
+    with _bloqueo():
+        fila.to_csv(DATA_FILE, mode="a", header=False, index=False)
+        _acumular_resumen(fila)
+
+
+def actualizar_estado(idx, estado, usuario=""):
+    """Decide un movimiento pendiente. False si ya estaba decidido (clic repetido o de otro jefe)."""
+    inicializar_caja()
+    with _bloqueo():
+        df = _leer_movimientos()
+        if idx not in df.index or df.loc[idx, "estado"] != "Pendiente":
+            return False
+        anterior = df.loc[[idx]].copy()
+        df.loc[idx, "estado"] = estado
+        if estado == "Aprobado":
+            df.loc[idx, "aprobado_por"] = usuario
+        df.loc[idx, "fecha_aprobacion"] = datetime.now().strftime(FORMATO_FECHA)
+        _escribir_csv(df, DATA_FILE)
+
+        # Mover la fila del resumen: restar el estado anterior y sumar el nuevo
+        _acumular_resumen(anterior, signo=-1)
+        _acumular_resumen(df.loc[[idx]])
+        return True
+
+
+# =========================
+# Resumen mensual
+# =========================
+def _filas_resumen(df):
+    fecha = pd.to_datetime(df["fecha"], format=FORMATO_FECHA, errors="coerce")
+    decision = pd.to_datetime(df["fecha_aprobacion"], format=FORMATO_FECHA, errors="coerce")
+    # Filas sin alguna de las dos fechas (p. ej. anteriores a fecha_aprobacion)
+    # no cuentan para el tiempo de aprobación
+    con_tiempo = fecha.notna() & decision.notna()
+    horas = ((decision - fecha).dt.total_seconds() / 3600.0).where(con_tiempo, 0.0)
+
+    tabla = pd.DataFrame({
+        "mes": fecha.dt.strftime("%Y-%m").fillna(""),
+        "tipo": df["tipo"].astype("category"),
+        "estado": df["estado"].astype("category"),
+        "categoria": df["categoria"].astype("category"),
+        "usuario": df["usuario"].astype("category"),
+        "monto": df["monto"].astype("float64"),
+        "cantidad": 1,
+        "horas_aprobacion": horas,
+        "con_tiempo": con_tiempo.astype("int64")
+    })
+    filas = tabla.groupby(CLAVE_RESUMEN, observed=True, sort=False)[VALORES_RESUMEN].sum().reset_index()
+    for col in CLAVE_RESUMEN:
+        filas[col] = filas[col].astype(str)
+    return filas
+
+
+def reconstruir_resumen():
+    with _bloqueo():
+        filas = _filas_resumen(_leer_movimientos())
+        filas = filas.reindex(columns=CLAVE_RESUMEN + VALORES_RESUMEN)
+        _escribir_csv(filas, RESUMEN_FILE)
+    return filas
+
+
+def _leer_resumen():
+    return pd.read_csv(
+        RESUMEN_FILE,
+        dtype={**{c: str for c in CLAVE_RESUMEN}, "monto": "float64", "cantidad": "int64",
+               "horas_aprobacion": "float64", "con_tiempo": "int64"},
+        keep_default_na=False
+    )
+
+
+def cargar_resumen():
+    inicializar_caja()
+    with _bloqueo():
+        resumen = _leer_resumen()
+        # Si el resumen quedó desfasado del CSV (p. ej. escrito por una versión
+        # anterior o editado a mano) se reconstruye desde los movimientos.
+        if list(resumen.columns) != CLAVE_RESUMEN + VALORES_RESUMEN or \
+                int(resumen["cantidad"].sum()) != _contar_movimientos():
+            resumen = reconstruir_resumen()
+    return resumen
+
+
+def _acumular_resumen(df, signo=1):
+    delta = _filas_resumen(df)
+    delta[VALORES_RESUMEN] = delta[VALORES_RESUMEN] * signo
+
+    with _bloqueo():
+        resumen = pd.concat([_leer_resumen(), delta], ignore_index=True)
+        resumen = resumen.groupby(CLAVE_RESUMEN, sort=True)[VALORES_RESUMEN].sum().reset_index()
+        resumen = resumen[resumen["cantidad"] != 0]
+        _escribir_csv(resumen, RESUMEN_FILE)
+
 
 def calcular_totales():
-    df = cargar_movimientos()
-    ingresos = df[df["tipo"] == "ingreso"]["monto"].sum()
-    egresos_aprobados = df[(df["tipo"] == "egreso") & (df["estado"] == "Aprobado")]["monto"].sum()
+    totales = cargar_resumen().groupby(["tipo", "estado"])["monto"].sum()
+    ingresos = float(totales.get("ingreso", pd.Series(dtype="float64")).sum())
+    egresos_aprobados = float(totales.get(("egreso", "Aprobado"), 0.0))
     saldo = ingresos - egresos_aprobados
     return ingresos, egresos_aprobados, saldo
 
-def guardar_comprobante(archivo, usuario):
+
+def reporte_mensual(resumen=None):
+    if resumen is None:
+        resumen = cargar_resumen()
+
+    ingresos = resumen[resumen["tipo"] == "ingreso"]
+    egresos = resumen[(resumen["tipo"] == "egreso") & (resumen["estado"] == "Aprobado")]
+    decididos = resumen[(resumen["tipo"] == "egreso") & (resumen["estado"] != "Pendiente")]
+
+    saldo = pd.DataFrame({
+        "ingresos": ingresos.groupby("mes")["monto"].sum(),
+        "egresos": egresos.groupby("mes")["monto"].sum()
+    }).fillna(0.0).sort_index()
+    saldo["saldo"] = (saldo["ingresos"] - saldo["egresos"]).cumsum()
+
+    por_categoria = egresos.pivot_table(index="mes", columns="categoria", values="monto",
+                                        aggfunc="sum", fill_value=0.0)
+    por_usuario = egresos.pivot_table(index="mes", columns="usuario", values="monto",
+                                      aggfunc="sum", fill_value=0.0)
+
+    aprobacion = decididos.groupby("mes")[["horas_aprobacion", "con_tiempo", "cantidad"]].sum()
+    aprobacion = aprobacion[aprobacion["con_tiempo"] > 0]
+    aprobacion["horas_promedio"] = aprobacion["horas_aprobacion"] / aprobacion["con_tiempo"]
+
+    return {
+        "saldo": saldo,
+        "por_categoria": por_categoria,
+        "por_usuario": por_usuario,
+        "aprobacion": aprobacion[["horas_promedio", "con_tiempo", "cantidad"]]
+    }
+
+# =========================
+# Comprobantes
+# =========================
+def _a_jpeg(img, lado_max):
+    img = ImageOps.exif_transpose(img).convert("RGB")
+    img.thumbnail((lado_max, lado_max))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=CALIDAD_JPEG, optimize=True)
+    return buf.getvalue()
+
+
+def _escribir(ruta, contenido):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    # Las sesiones son hilos del mismo proceso: el pid solo no basta para separarlas
+    tmp = f"{ruta}.tmp{os.getpid()}_{threading.get_ident()}"
+    with open(tmp, "wb") as f:
+        f.write(contenido)
+    os.replace(tmp, ruta)
+
+
+def guardar_comprobante(archivo):
     if not archivo:
         return ""
-    ext = os.path.splitext(archivo.name)[1]
-    nombre = f"{usuario}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
-    ruta = os.path.join(COMPROBANTES_DIR, nombre)
-    with open(ruta, "wb") as f:
-        f.write(archivo.getbuffer())
+    datos = bytes(archivo.getbuffer())
+    digest = hashlib.sha256(datos).hexdigest()
+    ext = os.path.splitext(archivo.name)[1].lower()
+
+    # Mismo contenido -> misma ruta: un comprobante subido dos veces se guarda una sola vez
+    ruta = os.path.join(COMPROBANTES_DIR, digest[:2], digest + (".pdf" if ext == ".pdf" else ".jpg"))
+    if not os.path.exists(ruta):
+        contenido = datos
+        if ext != ".pdf":
+            try:
+                contenido = _a_jpeg(Image.open(io.BytesIO(datos)), LADO_MAX_COMPROBANTE)
+            except Exception:
+                ruta = os.path.join(COMPROBANTES_DIR, digest[:2], digest + ext)
+        _escribir(ruta, contenido)
+
+    generar_preview(ruta)
     return ruta
 
+
+def ruta_preview(ruta):
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    return os.path.join(PREVIEWS_DIR, f"{nombre}.jpg")
+
+
+def _primera_pagina_pdf(ruta):
+    if pdfium is None:
+        return None
+    pdf = pdfium.PdfDocument(ruta)
+    try:
+        pagina = pdf[0]
+        escala = LADO_PREVIEW / max(pagina.get_width(), pagina.get_height())
+        return pagina.render(scale=escala).to_pil()
+    finally:
+        pdf.close()
+
+
+def generar_preview(ruta):
+    """Devuelve la ruta de la vista previa de un comprobante, creándola si falta."""
+    destino = ruta_preview(ruta)
+    if os.path.exists(destino):
+        return destino
+    try:
+        if ruta.lower().endswith(".pdf"):
+            img = _primera_pagina_pdf(ruta)
+            if img is None:
+                return ""
+        else:
+            img = Image.open(ruta)
+        _escribir(destino, _a_jpeg(img, LADO_PREVIEW))
+    except Exception:
+        return ""
+    return destino
+
+
+def mostrar_comprobante(ruta, key):
+    if not os.path.exists(ruta):
+        st.warning(f"No se encontró el comprobante: {ruta}")
+        return
+
+    es_pdf = ruta.lower().endswith(".pdf")
+    preview = generar_preview(ruta)
+    if preview:
+        st.image(preview, caption="Comprobante PDF (primera página)" if es_pdf else None)
+    elif es_pdf:
+        st.write("📄 Comprobante PDF adjunto")
+
+    if st.toggle("Ver original", key=key):
+        if es_pdf:
+            with open(ruta, "rb") as f:
+                st.download_button("Descargar PDF", f.read(), file_name=os.path.basename(ruta),
+                                   mime="application/pdf", key=f"{key}_pdf")
+        else:
+            st.image(ruta, use_column_width=True)
+
 def mostrar_caja_chica():
     inicializar_caja()
     usuario = st.session_state.get("usuario_logueado", "desconocido")
@@ -46,124 +345,180 @@ def mostrar_caja_chica():
 
     st.subheader("Caja Chica")
 
-    # Totales arriba
+    # Totales arriba: se recalculan solo en reruns completos (tras registrar o decidir)
     ingresos, egresos_aprobados, saldo = calcular_totales()
     col1, col2, col3 = st.columns(3)
     col1.metric("Total Ingresos", f"S/ {ingresos:,.2f}", delta_color="normal")
     col2.metric("Total Egresos aprobados", f"S/ {egresos_aprobados:,.2f}", delta_color="inverse")
     col3.metric("Saldo actual", f"S/ {saldo:,.2f}", delta_color="normal")
 
-    tab_reg, tab_mis, tab_apr = st.tabs(["Registrar", "Mis movimientos", "Aprobaciones"])
+    tab_reg, tab_mis, tab_apr, tab_rep = st.tabs(["Registrar", "Mis movimientos", "Aprobaciones", "Reportes"])
 
+    # Cada pestaña es un fragmento: un widget de una pestaña no re-ejecuta las otras
     with tab_reg:
-        # Formulario para INGRESOS (solo jefe)
-        st.markdown("### Registrar Ingreso (reposición)")
-        if not es_jefe:
-            st.info("Solo el jefe puede registrar ingresos/reposiciones")
-        else:
-            with st.form("form_ingreso"):
-                monto_ing = st.number_input("Monto S/.", min_value=0.01, step=0.01, format="%.2f", key="monto_ing")
-                desc_ing = st.text_input("Descripción / motivo", key="desc_ing")
-                cat_ing = st.selectbox("Categoría", [
-                    "Reposición fondo", "Transferencia banco", "Otros ingresos"
-                ], key="cat_ing")
-                comp_ing = st.file_uploader("Comprobante (opcional)", type=["jpg", "png", "pdf"], key="comp_ing")
-
-                if st.form_submit_button("Registrar Ingreso", type="primary"):
-                    if monto_ing > 0:
-                        ruta = guardar_comprobante(comp_ing, usuario) if comp_ing else ""
-                        mov = {
-                            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                            "usuario": usuario,
-                            "tipo": "ingreso",
-                            "monto": monto_ing,
-                            "descripcion": desc_ing,
-                            "categoria": cat_ing,
-                            "comprobante": ruta,
-                            "estado": "Aprobado",
-                            "aprobado_por": usuario
-                        }
-                        guardar_movimiento(mov)
-                        st.success("Ingreso registrado correctamente")
-                        st.rerun()
-                    else:
-                        st.error("El monto debe ser mayor a 0")
-
-        st.divider()
-
-        # Formulario para EGRESOS (todos)
-        st.markdown("### Registrar Egreso (gasto)")
-        with st.form("form_egreso"):
-            monto_egr = st.number_input("Monto S/.", min_value=0.01, step=0.01, format="%.2f", key="monto_egr")
-            desc_egr = st.text_input("Descripción / motivo", key="desc_egr")
-            cat_egr = st.selectbox("Categoría", [
-                "Viáticos", "Transporte", "Materiales menores", "Limpieza/oficina", "Imprevistos", "Otros"
-            ], key="cat_egr")
-            comp_egr = st.file_uploader("Comprobante (foto/PDF)", type=["jpg", "png", "pdf"], key="comp_egr")
-
-            if st.form_submit_button("Registrar Egreso", type="primary"):
-                if monto_egr > 0:
-                    ruta = guardar_comprobante(comp_egr, usuario) if comp_egr else ""
+        seccion_registrar(usuario, es_jefe)
+    with tab_mis:
+        seccion_mis_movimientos(usuario)
+    with tab_apr:
+        seccion_aprobaciones(usuario, es_jefe)
+    with tab_rep:
+        seccion_reportes(es_jefe)
+
+
+@st.fragment
+def seccion_registrar(usuario, es_jefe):
+    # Formulario para INGRESOS (solo jefe)
+    st.markdown("### Registrar Ingreso (reposición)")
+    if not es_jefe:
+        st.info("Solo el jefe puede registrar ingresos/reposiciones")
+    else:
+        with st.form("form_ingreso"):
+            monto_ing = st.number_input("Monto S/.", min_value=0.01, step=0.01, format="%.2f", key="monto_ing")
+            desc_ing = st.text_input("Descripción / motivo", key="desc_ing")
+            cat_ing = st.selectbox("Categoría", [
+                "Reposición fondo", "Transferencia banco", "Otros ingresos"
+            ], key="cat_ing")
+            comp_ing = st.file_uploader("Comprobante (opcional)", type=["jpg", "png", "pdf"], key="comp_ing")
+
+            if st.form_submit_button("Registrar Ingreso", type="primary"):
+                if monto_ing > 0:
+                    ruta = guardar_comprobante(comp_ing) if comp_ing else ""
+                    ahora = datetime.now().strftime(FORMATO_FECHA)
                     mov = {
-                        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                        "fecha": ahora,
                         "usuario": usuario,
-                        "tipo": "egreso",
-                        "monto": monto_egr,
-                        "descripcion": desc_egr,
-                        "categoria": cat_egr,
+                        "tipo": "ingreso",
+                        "monto": monto_ing,
+                        "descripcion": desc_ing,
+                        "categoria": cat_ing,
                         "comprobante": ruta,
-                        "estado": "Pendiente",
-                        "aprobado_por": ""
+                        "estado": "Aprobado",
+                        "aprobado_por": usuario,
+                        "fecha_aprobacion": ahora
                     }
                     guardar_movimiento(mov)
-                    st.success("Egreso registrado. Espera aprobación del jefe.")
+                    st.success("Ingreso registrado correctamente")
                     st.rerun()
                 else:
                     st.error("El monto debe ser mayor a 0")
 
-    with tab_mis:
-        df = cargar_movimientos()
-        mios = df[df["usuario"] == usuario]
-        if mios.empty:
-            st.info("No tienes movimientos registrados aún")
-        else:
-            st.dataframe(
-                mios[["fecha", "tipo", "monto", "descripcion", "categoria", "estado"]].sort_values("fecha", ascending=False),
-                use_container_width=True,
-                hide_index=True,
-                column_config={"monto": st.column_config.NumberColumn("Monto", format="S/. %.2f")}
-            )
+    st.divider()
 
-    with tab_apr:
-        if not es_jefe:
-            st.info("Solo el jefe puede aprobar movimientos")
-            return
-
-        df = cargar_movimientos()
-        pendientes = df[(df["tipo"] == "egreso") & (df["estado"] == "Pendiente")]
-        if pendientes.empty:
-            st.success("No hay gastos pendientes de aprobación")
-        else:
-            for idx, row in pendientes.iterrows():
-                with st.expander(f"{row['fecha']} | {row['usuario']} | S/ {row['monto']:.2f}"):
-                    st.write("**Descripción:**", row["descripcion"])
-                    st.write("**Categoría:**", row["categoria"])
-                    if row["comprobante"]:
-                        if row["comprobante"].lower().endswith((".jpg", ".png", ".jpeg")):
-                            st.image(row["comprobante"], use_column_width=True)
-                        else:
-                            st.write("📄 Comprobante PDF adjunto")
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        if st.button("Aprobar", key=f"apr_{idx}"):
-                            df.loc[idx, "estado"] = "Aprobado"
-                            df.loc[idx, "aprobado_por"] = usuario
-                            df.to_csv(DATA_FILE, index=False)
+    # Formulario para EGRESOS (todos)
+    st.markdown("### Registrar Egreso (gasto)")
+    with st.form("form_egreso"):
+        monto_egr = st.number_input("Monto S/.", min_value=0.01, step=0.01, format="%.2f", key="monto_egr")
+        desc_egr = st.text_input("Descripción / motivo", key="desc_egr")
+        cat_egr = st.selectbox("Categoría", [
+            "Viáticos", "Transporte", "Materiales menores", "Limpieza/oficina", "Imprevistos", "Otros"
+        ], key="cat_egr")
+        comp_egr = st.file_uploader("Comprobante (foto/PDF)", type=["jpg", "png", "pdf"], key="comp_egr")
+
+        if st.form_submit_button("Registrar Egreso", type="primary"):
+            if monto_egr > 0:
+                ruta = guardar_comprobante(comp_egr) if comp_egr else ""
+                mov = {
+                    "fecha": datetime.now().strftime(FORMATO_FECHA),
+                    "usuario": usuario,
+                    "tipo": "egreso",
+                    "monto": monto_egr,
+                    "descripcion": desc_egr,
+                    "categoria": cat_egr,
+                    "comprobante": ruta,
+                    "estado": "Pendiente",
+                    "aprobado_por": "",
+                    "fecha_aprobacion": ""
+                }
+                guardar_movimiento(mov)
+                st.success("Egreso registrado. Espera aprobación del jefe.")
+                st.rerun()
+            else:
+                st.error("El monto debe ser mayor a 0")
+
+
+@st.fragment
+def seccion_mis_movimientos(usuario):
+    df = cargar_movimientos()
+    mios = df[df["usuario"] == usuario]
+    if mios.empty:
+        st.info("No tienes movimientos registrados aún")
+    else:
+        st.dataframe(
+            mios[["fecha", "tipo", "monto", "descripcion", "categoria", "estado"]].sort_values("fecha", ascending=False),
+            use_container_width=True,
+            hide_index=True,
+            column_config={"monto": st.column_config.NumberColumn("Monto", format="S/. %.2f")}
+        )
+
+
+@st.fragment
+def seccion_aprobaciones(usuario, es_jefe):
+    if not es_jefe:
+        st.info("Solo el jefe puede aprobar movimientos")
+        return
+
+    df = cargar_movimientos()
+    pendientes = df[(df["tipo"] == "egreso") & (df["estado"] == "Pendiente")]
+    if pendientes.empty:
+        st.success("No hay gastos pendientes de aprobación")
+    else:
+        for idx, row in pendientes.iterrows():
+            with st.expander(f"{row['fecha']} | {row['usuario']} | S/ {row['monto']:.2f}"):
+                st.write("**Descripción:**", row["descripcion"])
+                st.write("**Categoría:**", row["categoria"])
+                if row["comprobante"]:
+                    mostrar_comprobante(row["comprobante"], key=f"orig_{idx}")
+                col1, col2 = st.columns(2)
+                with col1:
+                    if st.button("Aprobar", key=f"apr_{idx}"):
+                        if actualizar_estado(idx, "Aprobado", usuario):
                             st.success("Aprobado")
-                            st.rerun()
-                    with col2:
-                        if st.button("Rechazar", key=f"rec_{idx}"):
-                            df.loc[idx, "estado"] = "Rechazado"
-                            df.to_csv(DATA_FILE, index=False)
+                        else:
+                            st.warning("Este movimiento ya fue decidido")
+                        st.rerun()
+                with col2:
+                    if st.button("Rechazar", key=f"rec_{idx}"):
+                        if actualizar_estado(idx, "Rechazado"):
                             st.success("Rechazado")
-                            st.rerun()
+                        else:
+                            st.warning("Este movimiento ya fue decidido")
+                        st.rerun()
+
+
+@st.fragment
+def seccion_reportes(es_jefe):
+    if not es_jefe:
+        st.info("Solo el jefe puede ver los reportes")
+        return
+    mostrar_reportes()
+
+
+def mostrar_reportes():
+    rep = reporte_mensual()
+    if rep["saldo"].empty:
+        st.info("Aún no hay movimientos para reportar")
+        return
+
+    st.markdown("### Saldo en el tiempo")
+    st.line_chart(rep["saldo"][["saldo"]])
+
+    st.markdown("### Egresos aprobados por categoría (mensual)")
+    st.bar_chart(rep["por_categoria"])
+
+    st.markdown("### Egresos aprobados por usuario (mensual)")
+    st.bar_chart(rep["por_usuario"])
+
+    st.markdown("### Tiempo de aprobación")
+    aprobacion = rep["aprobacion"]
+    if aprobacion.empty:
+        st.info("Aún no hay egresos aprobados o rechazados con fecha de aprobación")
+    else:
+        st.dataframe(
+            aprobacion,
+            use_container_width=True,
+            column_config={
+                "horas_promedio": st.column_config.NumberColumn("Horas promedio", format="%.1f h"),
+                "con_tiempo": st.column_config.NumberColumn("Con fecha de aprobación"),
+                "cantidad": st.column_config.NumberColumn("Egresos decididos")
+            }
+        )
@@ -0,0 +1,103 @@
+# envios.py
+# Registro de envíos procesados del parte diario. Cada formulario lleva un token;
+# el primer envío lo reclama (bajo bloqueo) y los repetidos esperan y devuelven el
+# resultado del primero en lugar de volver a procesar.
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se bloquea entre hilos del mismo proceso
+    fcntl = None
+
+ENVIOS_DIR = "obras/envios"
+LOCK_FILE = os.path.join(ENVIOS_DIR, ".envios.lock")
+
+# Un envío "en_proceso" más antiguo que esto se considera abandonado (el proceso
+# murió a mitad): guardado + PDF + subida con timeout de 120 s caben de sobra.
+VENCIMIENTO_S = 300
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def _bloqueo():
+    with _lock:
+        os.makedirs(ENVIOS_DIR, exist_ok=True)
+        with open(LOCK_FILE, "a") as archivo:
+            if fcntl is not None:
+                fcntl.flock(archivo, fcntl.LOCK_EX)
+            yield
+
+
+def _ruta(token: str) -> str:
+    nombre = "".join(ch for ch in str(token) if ch.isalnum() or ch in ("_", "-", "."))
+    return os.path.join(ENVIOS_DIR, f"{nombre}.json")
+
+
+def _leer(token: str):
+    try:
+        with open(_ruta(token), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _vencido(registro) -> bool:
+    if not registro or registro.get("estado") != "en_proceso":
+        return False
+    try:
+        inicio = datetime.fromisoformat(registro["inicio"])
+    except (KeyError, TypeError, ValueError):
+        return True
+    return (datetime.now() - inicio).total_seconds() > VENCIMIENTO_S
+
+
+def _escribir(token: str, registro: dict) -> None:
+    ruta = _ruta(token)
+    tmp = f"{ruta}.tmp{os.getpid()}_{threading.get_ident()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(registro, f, ensure_ascii=False, default=str)
+    os.replace(tmp, ruta)
+
+
+def reclamar_envio(token: str) -> bool:
+    """True si este envío debe procesarse; False si ya fue procesado o está en curso."""
+    with _bloqueo():
+        if os.path.exists(_ruta(token)) and not _vencido(_leer(token)):
+            return False
+        _escribir(token, {"estado": "en_proceso", "inicio": datetime.now().isoformat(timespec="seconds")})
+        return True
+
+
+def liberar_envio(token: str) -> None:
+    """Descarta un reclamo cuyo procesamiento falló, para que el reintento pueda pasar."""
+    with _bloqueo():
+        registro = _leer(token)
+        if registro and registro.get("estado") == "en_proceso":
+            os.remove(_ruta(token))
+
+
+def registrar_resultado(token: str, resultado: dict) -> None:
+    with _bloqueo():
+        _escribir(token, {"estado": "listo", "fin": datetime.now().isoformat(timespec="seconds"),
+                          "resultado": resultado})
+
+
+def esperar_resultado(token: str, timeout: float = 150.0, intervalo: float = 0.5):
+    """Resultado del primer envío del token, esperando si aún se procesa (None si no llega)."""
+    limite = time.monotonic() + timeout
+    while True:
+        registro = _leer(token)
+        if registro is None or _vencido(registro):
+            # Reclamo liberado tras un error, o abandonado: no hay resultado que esperar
+            return None
+        if registro.get("estado") == "listo":
+            return registro.get("resultado")
+        if time.monotonic() >= limite:
+            return None
+        time.sleep(intervalo)
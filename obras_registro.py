@@ -0,0 +1,87 @@
+# obras_registro.py
+# Registro de obras en SQLite: nombre, presupuesto y usuarios asignados.
+# La app lo lee una vez (cacheado) y solo abre el JSON de la obra seleccionada.
+import os
+import sqlite3
+from contextlib import closing
+
+REGISTRO_DB = "obras/registro.sqlite"
+
+# Obras con las que se crea el registro la primera vez
+OBRAS_INICIALES = {
+    "rinconada": ("La Rinconada – La Molina", None),
+    "pachacutec": ("Ciudad Pachacútec – Ventanilla", 99524.0)
+}
+
+
+def _conectar():
+    os.makedirs(os.path.dirname(REGISTRO_DB), exist_ok=True)
+    return closing(sqlite3.connect(REGISTRO_DB, timeout=30))
+
+
+def inicializar_registro():
+    with _conectar() as con, con:
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS obras (
+                clave TEXT PRIMARY KEY,
+                nombre TEXT NOT NULL,
+                presupuesto REAL
+            )
+        """)
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS usuarios (
+                usuario TEXT PRIMARY KEY,
+                clave TEXT NOT NULL REFERENCES obras(clave)
+            )
+        """)
+        if con.execute("SELECT COUNT(*) FROM obras").fetchone()[0] == 0:
+            # OR IGNORE: otro proceso puede estar sembrando el registro al mismo tiempo
+            con.executemany(
+                "INSERT OR IGNORE INTO obras (clave, nombre, presupuesto) VALUES (?, ?, ?)",
+                [(clave, nombre, presupuesto) for clave, (nombre, presupuesto) in OBRAS_INICIALES.items()]
+            )
+
+
+def cargar_registro() -> dict:
+    """{"obras": {clave: {"nombre", "presupuesto"}}, "usuarios": {usuario: clave}}, obras ordenadas por nombre."""
+    inicializar_registro()
+    with _conectar() as con:
+        obras = {
+            clave: {"nombre": nombre, "presupuesto": presupuesto}
+            for clave, nombre, presupuesto in con.execute(
+                "SELECT clave, nombre, presupuesto FROM obras ORDER BY nombre COLLATE NOCASE")
+        }
+        usuarios = dict(con.execute("SELECT usuario, clave FROM usuarios"))
+    return {"obras": obras, "usuarios": usuarios}
+
+
+def registrar_obra(clave: str, nombre: str, presupuesto=None, usuarios=()):
+    inicializar_registro()
+    with _conectar() as con, con:
+        con.execute(
+            "INSERT INTO obras (clave, nombre, presupuesto) VALUES (?, ?, ?) "
+            "ON CONFLICT(clave) DO UPDATE SET nombre = excluded.nombre, presupuesto = excluded.presupuesto",
+            (clave, nombre, presupuesto)
+        )
+        con.executemany(
+            "INSERT INTO usuarios (usuario, clave) VALUES (?, ?) "
+            "ON CONFLICT(usuario) DO UPDATE SET clave = excluded.clave",
+            [(u, clave) for u in usuarios]
+        )
+
+
+def obra_de_usuario(registro: dict, usuario: str):
+    clave = registro["usuarios"].get(usuario)
+    if clave is None:
+        # Sin asignación explícita: convención "pasante-<obra>"
+        partes = str(usuario).split("-", 1)
+        clave = partes[1] if len(partes) == 2 else None
+    return clave if clave in registro["obras"] else None
+
+
+def buscar_obras(registro: dict, texto: str = "") -> list:
+    texto = (texto or "").strip().lower()
+    if not texto:
+        return list(registro["obras"])
+    return [clave for clave, obra in registro["obras"].items()
+            if texto in clave.lower() or texto in obra["nombre"].lower()]
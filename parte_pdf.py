@@ -0,0 +1,231 @@
+# parte_pdf.py
+import io
+import os
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from PIL import Image, ImageOps
+
+# Fotos que se insertan tal cual (DCT) sin decodificar: JPEG baseline ya orientado
+# y de tamaño razonable. El resto se decodifica y se reduce a FOTO_LADO_MAX.
+FOTO_LADO_MAX = 2400
+FOTO_BYTES_MAX = 2 * 1024 * 1024
+ORIENTACION_EXIF = 0x0112
+
+
+# =========================
+# PDF (Bytes)
+# =========================
+def _draw_wrapped_text(c, text, x, y, max_width, line_height=14, font="Helvetica", size=10):
+    c.setFont(font, size)
+    words = (text or "").split()
+    if not words:
+        return y
+
+    line = ""
+    for w in words:
+        test = (line + " " + w).strip()
+        if c.stringWidth(test, font, size) <= max_width:
+            line = test
+        else:
+            c.drawString(x, y, line)
+            y -= line_height
+            line = w
+
+    if line:
+        c.drawString(x, y, line)
+        y -= line_height
+
+    return y
+
+
+def _jpeg_directo(path):
+    """(ancho, alto) si el JPEG puede embeberse sin recodificar; None si no.
+
+    Image.open solo lee las cabeceras, la imagen no se decodifica aquí.
+    """
+    if os.path.splitext(path)[1].lower() not in (".jpg", ".jpeg"):
+        return None
+    if os.path.getsize(path) > FOTO_BYTES_MAX:
+        return None
+    try:
+        with Image.open(path) as img:
+            if img.format != "JPEG" or img.mode not in ("RGB", "L"):
+                return None
+            if img.info.get("progressive") or img.info.get("progression"):
+                return None
+            if img.getexif().get(ORIENTACION_EXIF, 1) != 1:
+                return None
+            iw, ih = img.size
+    except Exception:
+        return None
+    if max(iw, ih) > FOTO_LADO_MAX:
+        return None
+    return iw, ih
+
+
+def preparar_foto(path, permitir_directo=True):
+    """Devuelve (fuente, ancho, alto) para c.drawImage.
+
+    La fuente es la ruta del JPEG cuando se puede embeber directo (reportlab copia
+    el stream DCT), o un ImageReader con la foto ya orientada y reducida.
+    """
+    if permitir_directo:
+        tam = _jpeg_directo(path)
+        if tam:
+            return path, tam[0], tam[1]
+
+    img = Image.open(path)
+    img = ImageOps.exif_transpose(img)
+    img = img.convert("RGB")
+    img.thumbnail((FOTO_LADO_MAX, FOTO_LADO_MAX))
+    iw, ih = img.size
+    return ImageReader(img), iw, ih
+
+
+def generate_parte_diario_pdf_bytes(
+    obra_key: str,
+    obra_name: str,
+    fecha_str: str,
+    responsable: str,
+    avance_pct: int,
+    obs: str,
+    gastos_rows: list,
+    total_gastos_hoy: float,
+    rutas_fotos: list
+) -> io.BytesIO:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin = 2 * cm
+    y = height - margin
+
+    # Header
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(margin, y, "PARTE DIARIO DE OBRA")
+    y -= 18
+
+    c.setFont("Helvetica", 11)
+    c.drawString(margin, y, f"Obra: {obra_name}")
+    y -= 14
+    c.drawString(margin, y, f"Fecha: {fecha_str}")
+    y -= 14
+    c.drawString(margin, y, f"Responsable: {responsable}")
+    y -= 14
+    c.drawString(margin, y, f"Avance logrado hoy: {avance_pct}%")
+    y -= 18
+
+    # Observaciones
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(margin, y, "Observaciones")
+    y -= 14
+    c.setFont("Helvetica", 10)
+    y = _draw_wrapped_text(c, obs or "-", margin, y, max_width=width - 2 * margin, line_height=13, size=10)
+    y -= 6
+
+    # Gastos
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(margin, y, "Gastos del día")
+    y -= 14
+
+    col_tipo = margin
+    col_det = margin + 4.2 * cm
+
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(col_tipo, y, "Tipo")
+    c.drawString(col_det, y, "Detalle")
+    c.drawRightString(width - margin, y, "Monto (S/)")
+    y -= 10
+    c.line(margin, y, width - margin, y)
+    y -= 12
+
+    c.setFont("Helvetica", 9)
+
+    if not gastos_rows:
+        c.drawString(margin, y, "Sin gastos registrados.")
+        y -= 14
+    else:
+        for row in gastos_rows:
+            tipo = str(row.get("tipo", "")).strip()
+            detalle = str(row.get("detalle", "")).strip() or "-"
+            monto = float(row.get("monto", 0.0) or 0.0)
+
+            if y < 6 * cm:
+                c.showPage()
+                y = height - margin
+                c.setFont("Helvetica-Bold", 12)
+                c.drawString(margin, y, "Gastos del día (continuación)")
+                y -= 16
+                c.setFont("Helvetica", 9)
+
+            c.drawString(col_tipo, y, (tipo[:28] + "…") if len(tipo) > 28 else tipo)
+
+            max_det_w = (width - margin) - col_det - 4.0 * cm
+            y_det = _draw_wrapped_text(c, detalle, col_det, y, max_width=max_det_w, line_height=11, font="Helvetica", size=9)
+
+            c.drawRightString(width - margin, y, f"{monto:,.2f}")
+            y = min(y_det, y - 11)
+
+    y -= 8
+    c.setFont("Helvetica-Bold", 10)
+    c.drawRightString(width - margin, y, f"TOTAL HOY: S/ {float(total_gastos_hoy):,.2f}")
+    y -= 18
+
+    # Fotos
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(margin, y, "Evidencia fotográfica")
+    y -= 14
+
+    if not rutas_fotos:
+        c.setFont("Helvetica", 10)
+        c.drawString(margin, y, "Sin fotos adjuntas.")
+        y -= 14
+    else:
+        max_img_w = width - 2 * margin
+        max_img_h = 7.5 * cm
+
+        for i, path in enumerate(rutas_fotos, start=1):
+            if not os.path.exists(path):
+                continue
+
+            if y < (max_img_h + 3 * cm):
+                c.showPage()
+                y = height - margin
+                c.setFont("Helvetica-Bold", 12)
+                c.drawString(margin, y, "Evidencia fotográfica (continuación)")
+                y -= 18
+
+            try:
+                fuente, iw, ih = preparar_foto(path)
+                scale = min(max_img_w / iw, max_img_h / ih)
+                draw_w = iw * scale
+                draw_h = ih * scale
+
+                c.setFont("Helvetica", 9)
+                c.drawString(margin, y, f"Foto {i}: {os.path.basename(path)}")
+                y -= 12
+
+                c.drawImage(
+                    fuente,
+                    margin,
+                    y - draw_h,
+                    width=draw_w,
+                    height=draw_h,
+                    preserveAspectRatio=True,
+                    mask=None if isinstance(fuente, str) else "auto"
+                )
+                y -= (draw_h + 14)
+
+            except Exception as e:
+                c.setFont("Helvetica", 10)
+                c.drawString(margin, y, f"No se pudo insertar la imagen: {os.path.basename(path)} | {e}")
+                y -= 14
+
+    c.setFont("Helvetica-Oblique", 8)
+    c.drawString(margin, 1.2 * cm, f"Generado automáticamente | Obra: {obra_key}")
+    c.save()
+
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,107 @@
+# serie_gastos.py
+# Índice diario de gastos por obra: días ordenados (ordinales) con la suma
+# acumulada hasta cada día. Las consultas por rango son dos búsquedas binarias.
+import math
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+
+def _dia(fecha) -> int:
+    if isinstance(fecha, date):
+        return fecha.toordinal()
+    return date.fromisoformat(str(fecha)[:10]).toordinal()
+
+
+def construir_indice(gastos: list) -> dict:
+    por_dia = {}
+    n = 0
+    omitidos = 0
+    monto_omitido = 0.0
+    for g in gastos:
+        try:
+            dia = _dia(g.get("fecha", ""))
+            monto = float(g.get("monto", 0) or 0)
+        except Exception:
+            # Se registran para que indice_vigente reconozca el índice como actual
+            omitidos += 1
+            try:
+                monto_omitido += float(g.get("monto", 0) or 0)
+            except Exception:
+                pass
+            continue
+        por_dia[dia] = por_dia.get(dia, 0.0) + monto
+        n += 1
+
+    dias = sorted(por_dia)
+    acumulado = []
+    total = 0.0
+    for d in dias:
+        total += por_dia[d]
+        acumulado.append(total)
+    return {"dias": dias, "acumulado": acumulado, "n": n, "omitidos": omitidos,
+            "monto_omitido": monto_omitido}
+
+
+def indice_vigente(indice, gastos: list, gasto_acumulado: float) -> bool:
+    if not isinstance(indice, dict) or "n" not in indice:
+        return False
+    if indice["n"] + indice.get("omitidos", 0) != len(gastos):
+        return False
+    acumulado = indice.get("acumulado") or [0.0]
+    # gasto_acumulado también suma montos de gastos con fecha inválida
+    return abs(acumulado[-1] + indice.get("monto_omitido", 0.0) - float(gasto_acumulado)) < 0.005
+
+
+def agregar_gasto(indice: dict, fecha, monto: float) -> None:
+    dias = indice["dias"]
+    acumulado = indice["acumulado"]
+    dia = _dia(fecha)
+
+    i = bisect_left(dias, dia)
+    if i == len(dias) or dias[i] != dia:
+        dias.insert(i, dia)
+        acumulado.insert(i, acumulado[i - 1] if i else 0.0)
+
+    # Lo habitual es registrar gastos de hoy: solo se toca el último elemento
+    for j in range(i, len(acumulado)):
+        acumulado[j] += float(monto)
+    indice["n"] = indice.get("n", 0) + 1
+
+
+def _acumulado_hasta(indice: dict, dia: int) -> float:
+    k = bisect_right(indice["dias"], dia)
+    return indice["acumulado"][k - 1] if k else 0.0
+
+
+def gasto_total(indice: dict) -> float:
+    """Gasto acumulado de la obra, incluidos los gastos con fecha inválida."""
+    acumulado = indice["acumulado"][-1] if indice["acumulado"] else 0.0
+    return acumulado + indice.get("monto_omitido", 0.0)
+
+
+def gasto_en_rango(indice: dict, desde, hasta) -> float:
+    """Gasto entre dos fechas, ambas inclusive."""
+    return _acumulado_hasta(indice, _dia(hasta)) - _acumulado_hasta(indice, _dia(desde) - 1)
+
+
+def proyeccion_consumo(indice: dict, presupuesto: float, hoy: date, ventana_dias: int = 14):
+    """Ritmo diario de las últimas `ventana_dias` y fecha estimada de llegar al 100%."""
+    if presupuesto <= 0 or not indice["dias"]:
+        return None
+
+    total = _acumulado_hasta(indice, _dia(hoy))
+    ritmo = gasto_en_rango(indice, hoy - timedelta(days=ventana_dias - 1), hoy) / ventana_dias
+    if total >= presupuesto:
+        # Primer día en que el acumulado alcanzó el presupuesto
+        k = bisect_left(indice["acumulado"], presupuesto)
+        fecha_100 = date.fromordinal(indice["dias"][k])
+    elif ritmo > 0:
+        fecha_100 = hoy + timedelta(days=math.ceil((presupuesto - total) / ritmo))
+    else:
+        fecha_100 = None
+
+    return {"ritmo_diario": ritmo, "acumulado": total, "fecha_100": fecha_100}
+
+
+def serie_diaria(indice: dict) -> list:
+    return [(date.fromordinal(d), a) for d, a in zip(indice["dias"], indice["acumulado"])]